@@ -1,13 +1,17 @@
-import PySimpleGUI as sg
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
 
+import PySimpleGUI as sg
+
 from config import BacktestConfig
-from data import fetch_data, clean_data
+from data import fetch_data, clean_data, resample_bars
+from providers import get_provider
 from optimize import optimize_hilo, get_best
+from results import RESULTS
 from strategy import compute_hilo
 from report import plot_results, plot_comparison, save_to_excel
-from pathlib import Path
 
 # === determine the folder where this script lives ===
 base_path = Path(__file__).resolve().parent
@@ -17,14 +21,88 @@ reports_dir = base_path / 'Reports'
 reports_dir.mkdir(exist_ok=True)
 
 
+class BacktestCancelled(Exception):
+    """Raised inside the worker when the user presses Cancel."""
+
+
+def run_backtest(window: sg.Window, cfg: BacktestConfig, maxp: int, cancel: threading.Event) -> tuple:
+    """
+    The full pipeline for one symbol. Runs in the worker thread and reports
+    progress to the window as '-PROGRESS-' events (status text, percent).
+    """
+    def report(text: str, pct: float):
+        if cancel.is_set():
+            raise BacktestCancelled()
+        window.write_event_value('-PROGRESS-', (f"{cfg.symbol}: {text}", pct))
+
+    report('🔄 Fetching data...', 0)
+    raw = fetch_data(cfg.symbol, cfg.start, cfg.end, interval=cfg.interval,
+                     provider=get_provider(cfg.source, cfg.data_dir))
+    if cfg.resample:
+        raw = resample_bars(raw, cfg.resample)
+    if raw.empty:
+        raise ValueError(f"No data for {cfg.symbol} from {cfg.start} to {cfg.end}.")
+    report('🔄 Data fetched', 10)
+
+    df = clean_data(raw)
+    periods = range(10, maxp + 1)
+
+    # small blocks so the sweep reports progress (and can be cancelled) often
+    def swept(done: int, total: int):
+        report(f"⚙️ Optimizing... {done}/{total} periods", 10 + 60 * done / total)
+
+    opt_df = optimize_hilo(df, periods, cfg.transaction_cost,
+                           max_cells=10 * len(df), progress=swept,
+                           store=RESULTS, symbol=cfg.symbol)
+    best, ret = get_best(opt_df)
+
+    report(f"📊 Running final backtest (HiLo={best})...", 75)
+    final_df = compute_hilo(df, best, cfg.transaction_cost)
+    final_df['HiLo Period'] = best
+
+    report('📈 Generating plots...', 80)
+    reports_dir.mkdir(exist_ok=True)
+    s0, s1 = df.index[0].strftime(
+        '%Y-%m-%d'), df.index[-1].strftime('%Y-%m-%d')
+    # PNG bytes go straight into the workbook
+    opt_png = plot_results(opt_df, cfg.symbol)
+    cmp_png = plot_comparison(final_df, best, cfg.symbol, benchmarks=cfg.benchmarks)
+
+    report('📝 Writing report...', 90)
+    excel_file = reports_dir / f"{cfg.symbol}_{s0}_{s1}_report.xlsx"
+    save_to_excel(final_df, opt_df, [opt_png, cmp_png], excel_file)
+    return best, ret, excel_file
+
+
+def worker(window: sg.Window, jobs: queue.Queue, cancel: threading.Event):
+    """
+    Work through the queued (config, max period) jobs one after another.
+    A failing symbol is reported and the next one is started.
+    """
+    while True:
+        try:
+            cfg, maxp = jobs.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            best, ret, excel_file = run_backtest(window, cfg, maxp, cancel)
+            window.write_event_value('-DONE-', (cfg.symbol, best, ret, excel_file))
+        except BacktestCancelled:
+            window.write_event_value('-CANCELLED-', cfg.symbol)
+            break
+        except Exception as exc:
+            window.write_event_value('-FAILED-', (cfg.symbol, str(exc)))
+    window.write_event_value('-IDLE-', None)
+
+
 # --- GUI Setup ---
 sg.theme('DarkBlue14')  # Clean, modern theme
 layout = [
     [sg.Text('📈 HiLo Strategy Backtester', font=('Helvetica', 18),
              justification='center', expand_x=True)],
     [sg.Frame(layout=[
-        [sg.Text('Ticker Symbol:', size=(15, 1)), sg.Input(
-            'SOL-AUD', key='-SYM-', size=(20, 1))],
+        [sg.Text('Ticker Symbol(s):', size=(15, 1)), sg.Input(
+            'SOL-AUD', key='-SYM-', size=(20, 1), tooltip='Separate several tickers with commas')],
         [sg.Text('Start Date:',    size=(15, 1)), sg.Input('', key='-START-', size=(20, 1)),
          sg.CalendarButton('Select', target='-START-', format='%Y-%m-%d')],
         [sg.Text('End Date:',      size=(15, 1)), sg.Input('', key='-END-',   size=(20, 1)),
@@ -34,54 +112,73 @@ layout = [
         [sg.Text('Max HiLo Period:',  size=(15, 1)), sg.Slider(range=(
             5, 200), orientation='h', size=(25, 15), default_value=100, key='-MAX-')],
         [sg.Button('Run Backtest', font=('Helvetica', 12), size=(12, 1)),
+         sg.Button('Cancel', font=('Helvetica', 12), size=(8, 1), disabled=True),
          sg.Button('Quit', font=('Helvetica', 12), size=(8, 1))]
     ], title='Parameters', title_color='white', relief=sg.RELIEF_SUNKEN, tooltip='Adjust backtest settings')],
+    [sg.ProgressBar(100, orientation='h', size=(40, 10), key='-PROG-')],
     [sg.StatusBar('', size=(60, 1), key='-STATUS-')]
 ]
 
 window = sg.Window('HiLo Backtester', layout,
                    element_justification='center', finalize=True)
 
+jobs = queue.Queue()
+cancel = threading.Event()
+running = None
+
 while True:
     event, vals = window.read()
     if event in (sg.WIN_CLOSED, 'Quit'):
+        # stop the worker at its next progress check
+        cancel.set()
         break
     if event == 'Run Backtest':
-        sym = vals['-SYM-']
-        start = vals['-START-']
-        end = vals['-END-']
-        cost = float(vals['-COST-'])
+        try:
+            cost = float(vals['-COST-'])
+        except ValueError:
+            sg.popup_error(f"Invalid transaction cost: {vals['-COST-']}")
+            continue
         maxp = int(vals['-MAX-'])
-
-        window['-STATUS-'].update('🔄 Fetching data...')
-        raw = fetch_data(sym, start, end)
-        if raw.empty:
-            sg.popup_error(f"No data for {sym} from {start} to {end}.")
-            window['-STATUS-'].update('Ready')
+        for sym in [s.strip() for s in vals['-SYM-'].split(',') if s.strip()]:
+            jobs.put((BacktestConfig(symbol=sym, start=vals['-START-'], end=vals['-END-'],
+                                     transaction_cost=cost), maxp))
+        # start a worker unless one is already draining the queue
+        if running is None or not running.is_alive():
+            cancel.clear()
+            running = threading.Thread(target=worker, args=(window, jobs, cancel), daemon=True)
+            running.start()
+            window['Cancel'].update(disabled=False)
+        window['-STATUS-'].update(f'⏳ {jobs.qsize()} symbol(s) queued')
+    elif event == 'Cancel':
+        # drop everything still queued and stop the running symbol
+        while not jobs.empty():
+            jobs.get_nowait()
+        cancel.set()
+        window['-STATUS-'].update('⏹ Cancelling...')
+    elif event == '-PROGRESS-':
+        text, pct = vals[event]
+        window['-STATUS-'].update(text)
+        window['-PROG-'].update(int(pct))
+    elif event == '-DONE-':
+        sym, best, ret, excel_file = vals[event]
+        sg.popup_non_blocking('✅ Done', f"{sym}: optimal HiLo = {best} days (Return: {ret:.2f}x)",
+                              f"Report saved to:\n{excel_file}")
+    elif event == '-FAILED-':
+        sym, msg = vals[event]
+        sg.popup_non_blocking(f"❌ {sym} failed", msg)
+    elif event == '-CANCELLED-':
+        window['-STATUS-'].update(f'⏹ {vals[event]} cancelled')
+    elif event == '-IDLE-':
+        if not jobs.empty():
+            # symbols queued while the worker was finishing (Cancel empties
+            # the queue, so these were added after any cancel)
+            cancel.clear()
+            running = threading.Thread(target=worker, args=(window, jobs, cancel), daemon=True)
+            running.start()
             continue
-
-        df = clean_data(raw)
-        window['-STATUS-'].update('⚙️ Optimizing...')
-        opt_df = optimize_hilo(df, range(10, maxp+1), cost)
-        best, ret = get_best(opt_df)
-        sg.popup(f"Optimal HiLo = {best} days (Return: {ret:.2f}x)")
-
-        window['-STATUS-'].update('📊 Running final backtest...')
-        final_df = compute_hilo(df, best, cost)
-        final_df['HiLo Period'] = best
-
-        window['-STATUS-'].update('📈 Generating plots & report...')
-        reports_dir.mkdir(exist_ok=True)
-        s0, s1 = df.index[0].strftime(
-            '%Y-%m-%d'), df.index[-1].strftime('%Y-%m-%d')
-        opt_png = reports_dir / f"{sym}_{s0}_{s1}_opt.png"
-        cmp_png = reports_dir / f"{sym}_{s0}_{s1}_cmp.png"
-        plot_results(opt_df, sym, out_file=opt_png)
-        plot_comparison(final_df, best, sym, out_file=cmp_png)
-        excel_file = reports_dir / f"{sym}_{s0}_{s1}_report.xlsx"
-        save_to_excel(final_df, opt_df, [opt_png, cmp_png], excel_file)
-
-        sg.popup('✅ Done', f"Report saved to:\n{excel_file}")
-        window['-STATUS-'].update('Ready')
+        window['Cancel'].update(disabled=True)
+        window['-PROG-'].update(0)
+        if not cancel.is_set():
+            window['-STATUS-'].update('Ready')
 
 window.close()
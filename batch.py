@@ -0,0 +1,197 @@
+# batch.py
+import argparse
+import contextlib
+import logging
+import multiprocessing as mp
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from benchmark_data import BENCHMARKS, LOOKBACK, PROVIDER
+from config import BacktestConfig
+from data import CACHE_DIR, fetch_data, resample_bars
+from providers import get_provider
+from main import run_backtest, REPORTS_DIR
+from profiling import setup_logging
+from results import RESULTS, RESULTS_DB, ResultStore
+
+log = logging.getLogger(__name__)
+
+# semaphore shared by the pool workers to cap concurrent downloads
+_download_slots = None
+
+
+def load_symbols(path: Path) -> list[str]:
+    """
+    Read one ticker per line; blank lines and '#' comments are ignored.
+    """
+    symbols = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split('#', 1)[0].strip()
+        if line:
+            symbols.append(line)
+    return symbols
+
+
+def run_batch(
+    configs: list[BacktestConfig],
+    periods: range = range(10, 101),
+    workers: int = None,
+    max_downloads: int = 2,
+    reports_dir: Path = REPORTS_DIR,
+    out_file: Path = None,
+    cache_dir: Path = None,
+    data_format: str = 'xlsx',
+    plots: bool = True
+) -> pd.DataFrame:
+    """
+    Run the full backtest pipeline for many configs in a process pool
+    (in this process if workers=1).
+
+    At most 'max_downloads' workers fetch data at the same time. A failing
+    symbol is recorded in the 'Error' column instead of stopping the batch.
+    Returns the summary table and writes it to 'out_file' as CSV if given.
+
+    'cache_dir' replaces the Cache folder for prices and sweep results;
+    'data_format' and 'plots' are passed to run_backtest ('summary' skips
+    the reports, and with them the benchmark downloads).
+    """
+    if cache_dir is not None:
+        PROVIDER.cache_dir = Path(cache_dir)
+    if data_format != 'summary' and plots:
+        _prefetch_benchmarks(configs)
+    args = (periods, reports_dir, cache_dir, data_format, plots)
+    # (config position, summary row): a symbol may appear in several configs
+    rows = []
+
+    def collect(i, cfg, row):
+        row.setdefault('Mode', cfg.mode)
+        status = row.get('Error') or 'ok'
+        print(f"[{len(rows) + 1}/{len(configs)}] {cfg.symbol}: {status}")
+        rows.append((i, row))
+
+    if workers == 1:
+        # no pool to start: summary runs of a few symbols finish sooner
+        for i, cfg in enumerate(configs):
+            collect(i, cfg, _run_one(cfg, *args))
+    else:
+        slots = mp.get_context().Semaphore(max_downloads)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(slots, cache_dir)) as pool:
+            futures = {pool.submit(_run_one, cfg, *args): i for i, cfg in enumerate(configs)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                cfg = configs[i]
+                try:
+                    row = fut.result()
+                except Exception as exc:
+                    # e.g. a worker process that died; the other symbols carry on
+                    row = {'Symbol': cfg.symbol, 'Error': repr(exc)}
+                collect(i, cfg, row)
+
+    columns = ['Symbol', 'Mode', 'Start', 'End', 'Best HiLo', 'Cumulative Return',
+               'Cumulative Return (net)', 'Sharpe', 'Max Drawdown', 'Trades', 'Report', 'Error']
+    rows.sort(key=lambda item: item[0])
+    summary = pd.DataFrame([row for _, row in rows]).reindex(columns=columns)
+    summary[['Best HiLo', 'Trades']] = summary[['Best HiLo', 'Trades']].astype('Int64')
+    if out_file:
+        summary.to_csv(out_file, index=False)
+        print(f"Batch summary saved to {out_file}")
+    return summary
+
+
+def _prefetch_benchmarks(configs: list[BacktestConfig]):
+    # download the chart benchmarks once for the whole batch; the workers
+    # then read them from the disk cache instead of all downloading (and
+    # writing the cache) at the same time. Configs on local data read their
+    # benchmarks from the same files, so they download nothing
+    online = [cfg for cfg in configs if not cfg.offline and cfg.source == 'yahoo']
+    tickers = {t for cfg in online for t in (BENCHMARKS if cfg.benchmarks is None else cfg.benchmarks).values()}
+    if not tickers:
+        return
+    today = pd.Timestamp.now().normalize()
+    start = min(pd.Timestamp(cfg.start) if cfg.start else pd.Timestamp('1900-01-01') for cfg in online)
+    end = max(pd.Timestamp(cfg.end) if cfg.end else today + pd.Timedelta(days=1) for cfg in online)
+    try:
+        PROVIDER.prefetch(tickers, start - LOOKBACK, end)
+    except Exception as exc:
+        # the charts just leave out benchmarks that could not be loaded
+        log.warning("Could not prefetch benchmarks %s: %s", sorted(tickers), exc)
+
+
+def _init_worker(slots, cache_dir=None):
+    global _download_slots
+    _download_slots = slots
+    PROVIDER.offline = True
+    if cache_dir is not None:
+        PROVIDER.cache_dir = Path(cache_dir)
+
+
+def _run_one(cfg: BacktestConfig, periods: range, reports_dir: Path, cache_dir: Path = None,
+             data_format: str = 'xlsx', plots: bool = True) -> dict:
+    try:
+        provider = get_provider(cfg.source, cfg.data_dir)
+        # the chart benchmarks come from the same source as the prices
+        PROVIDER.use(provider)
+        with _download_slots or contextlib.nullcontext():
+            raw = fetch_data(cfg.symbol, cfg.start, cfg.end,
+                             cache_dir=CACHE_DIR if cache_dir is None else Path(cache_dir),
+                             offline=cfg.offline, interval=cfg.interval,
+                             provider=provider)
+        if cfg.resample:
+            raw = resample_bars(raw, cfg.resample)
+        if raw.empty:
+            return {'Symbol': cfg.symbol, 'Error': 'No data fetched'}
+        store = RESULTS if cache_dir is None else ResultStore(Path(cache_dir) / RESULTS_DB.name)
+        return run_backtest(cfg, raw, periods, reports_dir, data_format=data_format,
+                            store=store, plots=plots)
+    except Exception as exc:
+        traceback.print_exc()
+        return {'Symbol': cfg.symbol, 'Error': f"{type(exc).__name__}: {exc}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest HiLo on many symbols.')
+    parser.add_argument('symbols', type=Path, help='text file with one ticker per line')
+    parser.add_argument('--start', required=True, help="start date 'YYYY-MM-DD'")
+    parser.add_argument('--end', required=True, help="end date 'YYYY-MM-DD'")
+    parser.add_argument('--cost', type=float, default=0.003, help='transaction cost per trade')
+    parser.add_argument('--select', default='Cumulative Return %',
+                        help="column the best period is picked by, e.g. 'Sharpe'")
+    parser.add_argument('--min-hilo', type=int, default=10)
+    parser.add_argument('--max-hilo', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--downloads', type=int, default=2, help='max concurrent downloads')
+    parser.add_argument('--offline', action='store_true', help='use cached data only')
+    parser.add_argument('--interval', default='1d', help="bar size, e.g. '1d', '1h', '5m'")
+    parser.add_argument('--resample', help="aggregate into coarser bars, e.g. '15min'")
+    parser.add_argument('--source', default='yahoo', choices=['yahoo', 'local'],
+                        help='where the bars come from (default: Yahoo Finance)')
+    parser.add_argument('--data-dir', help='folder of npy/Parquet/CSV dumps for --source local')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='-v for progress messages, -vv for debug output')
+    args = parser.parse_args()
+    setup_logging(args.verbose)
+
+    configs = [
+        BacktestConfig(symbol=s, start=args.start, end=args.end,
+                       transaction_cost=args.cost, select=args.select, offline=args.offline,
+                       interval=args.interval, resample=args.resample,
+                       source=args.source, data_dir=args.data_dir)
+        for s in load_symbols(args.symbols)
+    ]
+    REPORTS_DIR.mkdir(exist_ok=True)
+    summary = run_batch(
+        configs,
+        periods=range(args.min_hilo, args.max_hilo + 1),
+        workers=args.workers,
+        max_downloads=args.downloads,
+        out_file=REPORTS_DIR / f"batch_{args.start}_{args.end}_summary.csv"
+    )
+    print(summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
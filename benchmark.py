@@ -0,0 +1,216 @@
+# benchmark.py
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import main as main_module
+from data import fetch_data, clean_data
+from optimize import optimize_hilo
+from strategy import compute_hilo
+from report import (EXCEL_MAX_ROWS, plot_results, plot_comparison, plot_signals_with_returns,
+                    render_charts, save_to_excel)
+from benchmark_data import PROVIDER
+
+BENCH_DIR = Path(__file__).resolve().parent / 'Benchmarks'
+PLOT_STAGES = ['plot_results', 'plot_comparison', 'plot_signals_with_returns']
+STAGES = ['clean_data', 'compute_hilo', 'optimize_hilo', *PLOT_STAGES, 'render_charts',
+          'save_to_excel', 'main']
+
+
+def synthetic_ohlcv(bars: int, start: str = '2000-01-01', end: str = None,
+                    symbol: str = None, seed: int = 0) -> pd.DataFrame:
+    """
+    Random-walk OHLCV frame shaped like yf.download output.
+
+    Bars are spread evenly between 'start' and 'end' (daily from 'start'
+    when 'end' is None). With a 'symbol' the columns get the
+    (Price, Ticker) MultiIndex that yfinance returns.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, bars)))
+    spread = np.abs(rng.normal(0, 0.01, (2, bars)))
+    if end is None:
+        index = pd.date_range(start, periods=bars, freq='D' if bars < 50_000 else 'min')
+    else:
+        index = pd.date_range(start, end, periods=bars + 1)[:-1]
+    df = pd.DataFrame({
+        'Adj Close': close,
+        'Close': close,
+        'High': close * (1 + spread[0]),
+        'Low': close * (1 - spread[1]),
+        'Open': close * (1 + rng.normal(0, 0.005, bars)),
+        'Volume': rng.integers(100_000, 10_000_000, bars).astype(np.float64),
+    }, index=pd.DatetimeIndex(index, name='Date'))
+    if symbol:
+        df.columns = pd.MultiIndex.from_product([df.columns, [symbol]], names=['Price', 'Ticker'])
+    return df
+
+
+def fake_download(bars: int):
+    """
+    Stand-in for yf.download that serves 'bars' synthetic bars for any
+    ticker and date range, so the whole pipeline runs without network.
+    """
+    def download(tickers, start=None, end=None, period=None, **kwargs):
+        start = pd.Timestamp(start) if start is not None else pd.Timestamp('2000-01-01')
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+        return synthetic_ohlcv(bars, start, end, symbol=tickers, seed=zlib.crc32(tickers.encode()))
+    return download
+
+
+def run_benchmarks(sizes: list[int], stages: list[str] = STAGES, repeat: int = 3,
+                   memory: bool = True, periods: range = range(10, 101),
+                   transaction_cost: float = 0.003) -> list[dict]:
+    """
+    Time every stage on synthetic data of each size. Each record holds the
+    best wall time of 'repeat' runs and, if 'memory', the peak traced
+    allocation of one extra run.
+    """
+    results = []
+    for bars in sizes:
+        raw = synthetic_ohlcv(bars, symbol='BENCH')
+        with tempfile.TemporaryDirectory() as tmp, _quiet(), \
+                mock.patch('yfinance.download', fake_download(bars)), \
+                mock.patch.object(PROVIDER, 'cache_dir', Path(tmp) / 'Cache'):
+            tmp = Path(tmp)
+            PROVIDER.clear()
+            clean = clean_data(raw)
+            opt = optimize_hilo(clean, periods, transaction_cost)
+            final = compute_hilo(clean, 50, transaction_cost)
+            final['HiLo Period'] = 50
+            imgs = [tmp / 'opt.png', tmp / 'cmp.png', tmp / 'signals.png']
+            data_format = 'xlsx' if bars <= EXCEL_MAX_ROWS else 'csv'
+            cases = {
+                'clean_data': lambda: clean_data(raw),
+                'compute_hilo': lambda: compute_hilo(clean, 50, transaction_cost),
+                'optimize_hilo': lambda: optimize_hilo(clean, periods, transaction_cost),
+                'plot_results': lambda: plot_results(opt, 'BENCH', out_file=imgs[0]),
+                'plot_comparison': lambda: plot_comparison(final, 50, 'BENCH', out_file=imgs[1]),
+                'plot_signals_with_returns': lambda: plot_signals_with_returns(final, 50, 'BENCH', out_file=imgs[2]),
+                # all three charts to PNG bytes, in parallel if there are cores
+                'render_charts': lambda: render_charts(opt, final, 50, 'BENCH',
+                                                       workers=min(3, os.cpu_count() or 1)),
+                'save_to_excel': lambda: save_to_excel(
+                    final, opt, imgs, tmp / 'report.xlsx', data_format=data_format),
+                'main': lambda: _run_main(tmp, data_format),
+            }
+            for stage in stages:
+                if stage == 'save_to_excel':
+                    # the report embeds the three charts
+                    for img, name in zip(imgs, PLOT_STAGES):
+                        if not img.exists():
+                            cases[name]()
+                results.append(_measure(stage, bars, cases[stage], repeat, memory))
+        print(f"{bars:>10,} bars: " + ', '.join(
+            f"{r['stage']} {r['seconds']:.3f}s" for r in results if r['bars'] == bars))
+    return results
+
+
+def compare(old_file: Path, new_file: Path) -> pd.DataFrame:
+    """
+    Side-by-side table of two benchmark files with the time ratio new/old.
+    """
+    old = pd.DataFrame(json.loads(Path(old_file).read_text())['results'])
+    new = pd.DataFrame(json.loads(Path(new_file).read_text())['results'])
+    table = old.merge(new, on=['stage', 'bars'], suffixes=(' old', ' new'))
+    table['ratio'] = table['seconds new'] / table['seconds old']
+    cols = ['stage', 'bars', 'seconds old', 'seconds new', 'ratio']
+    if 'peak_mb old' in table and 'peak_mb new' in table:
+        cols += ['peak_mb old', 'peak_mb new']
+    return table[cols]
+
+
+def _measure(stage: str, bars: int, func, repeat: int, memory: bool) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    record = {'stage': stage, 'bars': bars, 'seconds': min(times), 'runs': times}
+    if memory:
+        tracemalloc.start()
+        func()
+        record['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return record
+
+
+def _run_main(tmp: Path, data_format: str):
+    # the real main(), with the cache and the Reports folder kept in 'tmp'
+    run_backtest = functools.partial(main_module.run_backtest, reports_dir=tmp,
+                                     data_format=data_format, store=None)
+    with mock.patch.object(main_module, 'fetch_data',
+                           functools.partial(fetch_data, cache_dir=tmp / 'Cache')), \
+            mock.patch.object(main_module, 'run_backtest', run_backtest):
+        main_module.main()
+    for f in (tmp / 'Cache').glob('*/meta.json'):
+        f.unlink()  # every run starts with an empty cache
+
+
+@contextlib.contextmanager
+def _quiet():
+    # main() prints its best period and report path on every timed run;
+    # keep those result lines out of the benchmark output
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the HiLo pipeline on synthetic data.')
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='series lengths to benchmark')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage (best is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory run')
+    parser.add_argument('--out', type=Path, help='JSON file (default: Benchmarks/bench_<commit>_<time>.json)')
+    parser.add_argument('--compare', type=Path, nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two benchmark files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(*args.compare).to_string(index=False))
+        return
+
+    meta = _metadata()
+    results = run_benchmarks(args.bars, args.stages, args.repeat, not args.no_memory)
+    out = args.out
+    if out is None:
+        BENCH_DIR.mkdir(exist_ok=True)
+        stamp = meta['timestamp'].replace(':', '').replace('-', '')
+        out = BENCH_DIR / f"bench_{meta['commit'] or 'nogit'}_{stamp}.json"
+    out.write_text(json.dumps({'meta': meta, 'results': results}, indent=2))
+    print(f"Benchmark results saved to {out}")
+
+
+if __name__ == '__main__':
+    main()
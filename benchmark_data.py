@@ -0,0 +1,99 @@
+# benchmark_data.py
+import threading
+
+import pandas as pd
+
+from data import fetch_data, CACHE_DIR
+from providers import YAHOO, DataProvider
+
+# benchmarks drawn in the comparison chart, {label: Yahoo Finance ticker}
+BENCHMARKS = {'S&P 500': '^GSPC'}
+# bars loaded before the first strategy bar, so a strategy that starts on a
+# weekend or holiday still gets the previous benchmark close
+LOOKBACK = pd.Timedelta(days=7)
+
+
+class BenchmarkProvider:
+    """
+    Benchmark price series (e.g. the S&P 500) for the comparison chart.
+
+    Each ticker is loaded once per process and kept in memory; the bars come
+    from the local data cache, so only head or tail bars the cache is
+    missing are ever downloaded. With offline=True nothing is downloaded.
+    'source' is the data provider the bars come from (default: Yahoo).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, offline: bool = False, column: str = 'Adj Close',
+                 source: DataProvider = None):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.column = column
+        self.source = source
+        self._series = {}  # ticker -> (start, end, series)
+        self._lock = threading.Lock()
+
+    def load(self, ticker: str, start, end) -> pd.Series:
+        """
+        The benchmark column for 'ticker' covering at least [start, end).
+        Blank dates mean full history / up to today. A request outside the
+        range already in memory reloads the union of both ranges.
+        """
+        lo = pd.Timestamp(start) if start else pd.Timestamp('1900-01-01')
+        hi = pd.Timestamp(end) if end else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+        with self._lock:
+            held = self._series.get(ticker)
+            if held is not None and held[0] <= lo and hi <= held[1]:
+                return held[2]
+            if held is not None:
+                lo, hi = min(lo, held[0]), max(hi, held[1])
+            raw = fetch_data(ticker, lo.strftime('%Y-%m-%d'), hi.strftime('%Y-%m-%d'),
+                             cache_dir=self.cache_dir, offline=self.offline,
+                             provider=self.source)
+            if self.column in raw.columns:
+                series = raw[self.column].astype('float64')
+            else:
+                series = pd.Series(dtype='float64', index=pd.DatetimeIndex([], name='Date'))
+            if getattr(series.index, 'tz', None) is not None:
+                series.index = series.index.tz_localize(None)
+            series.name = ticker
+            self._series[ticker] = (lo, hi, series)
+            return series
+
+    def aligned(self, ticker: str, index: pd.DatetimeIndex) -> pd.Series:
+        """
+        The benchmark on the strategy's 'index': each bar gets the last
+        benchmark close at or before it (NaN if there is none).
+        """
+        series = self.load(ticker, index[0].normalize() - LOOKBACK,
+                           index[-1].normalize() + pd.Timedelta(days=1))
+        if series.empty:
+            return pd.Series(float('nan'), index=index, name=ticker)
+        # one reindex with fill instead of reindex() followed by ffill()
+        return series.reindex(index, method='ffill')
+
+    def prefetch(self, tickers, start, end):
+        """
+        Load 'tickers' for [start, end) up front, e.g. before starting
+        worker processes that then only read the disk cache.
+        """
+        for ticker in tickers:
+            self.load(ticker, start, end)
+
+    def use(self, source: DataProvider = None):
+        """
+        Load the benchmarks from 'source' (None: Yahoo) from now on, e.g.
+        the local files a run reads its own prices from. Series held from
+        another source are dropped.
+        """
+        with self._lock:
+            if (source or YAHOO) is not (self.source or YAHOO):
+                self.source = source
+                self._series.clear()
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+# shared by every chart drawn in this process
+PROVIDER = BenchmarkProvider()
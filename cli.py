@@ -0,0 +1,138 @@
+# cli.py
+import argparse
+import dataclasses
+import datetime
+import json
+import tomllib
+from pathlib import Path
+
+from config import BacktestConfig
+
+# job file keys that set up the run rather than a backtest; the command
+# line flags of the same name override them
+OPTIONS = ('periods', 'workers', 'downloads', 'cache_dir', 'reports_dir', 'format', 'plots', 'summary')
+FORMATS = ('xlsx', 'parquet', 'summary')
+
+
+def load_jobs(path: Path) -> tuple[list[BacktestConfig], dict]:
+    """
+    Read a job file (.toml, .json, or .yaml / .yml with PyYAML installed)
+    describing many backtests:
+
+        periods = [10, 100]          # first and last HiLo period (, step)
+        format = "summary"           # xlsx, parquet or summary
+
+        [defaults]                   # shared by every job
+        start = "2020-07-06"
+        end = "2025-07-06"
+
+        [[jobs]]
+        symbol = "BTC-USD"
+
+        [[jobs]]
+        symbols = ["ETH-USD", "SOL-USD"]
+        mode = "long-only"
+
+    Job keys are BacktestConfig fields; 'symbols' expands into one config
+    per ticker. Returns the configs and the run options (see OPTIONS).
+    """
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ImportError("YAML job files need PyYAML: pip install pyyaml") from exc
+        data = yaml.safe_load(text) or {}
+    elif path.suffix == '.toml':
+        data = tomllib.loads(text)
+    elif path.suffix == '.json':
+        data = json.loads(text)
+    else:
+        raise ValueError(f"Unknown job file type: {path.suffix} (use .toml, .json or .yaml)")
+
+    unknown = set(data) - set(OPTIONS) - {'defaults', 'jobs'}
+    if unknown:
+        raise ValueError(f"Unknown job file keys: {sorted(unknown)}")
+    options = {key: data[key] for key in OPTIONS if key in data}
+    if 'periods' in options:
+        first, last, *step = options['periods']
+        options['periods'] = range(int(first), int(last) + 1, int(step[0]) if step else 1)
+
+    configs = []
+    for job in data.get('jobs') or []:
+        job = {**(data.get('defaults') or {}), **job}
+        symbols = job.pop('symbols', None)
+        if symbols is None:
+            if 'symbol' not in job:
+                raise ValueError(f"Job without 'symbol' or 'symbols': {job}")
+            symbols = [job.pop('symbol')]
+        for symbol in symbols:
+            configs.append(_config({**job, 'symbol': symbol}))
+    if not configs:
+        raise ValueError(f"No jobs in {path}")
+    return configs, options
+
+
+def _config(job: dict) -> BacktestConfig:
+    fields = {f.name for f in dataclasses.fields(BacktestConfig)}
+    unknown = set(job) - fields
+    if unknown:
+        raise ValueError(f"Unknown job keys for {job['symbol']}: {sorted(unknown)}")
+    # TOML and YAML read unquoted dates as date objects
+    job = {k: v.isoformat() if isinstance(v, (datetime.date, datetime.datetime)) else v
+           for k, v in job.items()}
+    # strategy loads numpy and pandas, so --help and bad flags don't wait for it
+    from strategy import MODES
+    if job.get('mode', 'long-short') not in MODES:
+        raise ValueError(f"Unknown mode for {job['symbol']}: {job['mode']}")
+    return BacktestConfig(**job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the HiLo backtests described in a job file.')
+    parser.add_argument('jobs', type=Path, help='job file (.toml, .json, .yaml)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count; 1 runs in-process)')
+    parser.add_argument('--downloads', type=int, help='max concurrent downloads (default: 2)')
+    parser.add_argument('--cache-dir', type=Path, help='folder for cached prices and sweep results')
+    parser.add_argument('--reports-dir', type=Path, help='folder for the reports (default: Reports)')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='xlsx report, xlsx report with the bar data as Parquet, or the summary only')
+    parser.add_argument('--plots', action=argparse.BooleanOptionalAction,
+                        help='embed the charts in the reports (default: yes)')
+    parser.add_argument('--summary', type=Path, help='CSV file for the summary table')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='-v for progress messages, -vv for debug output')
+    args = parser.parse_args()
+
+    configs, options = load_jobs(args.jobs)
+    for key in OPTIONS:
+        value = getattr(args, key, None)
+        if value is not None:
+            options[key] = value
+
+    # the pipeline (pandas and friends) loads only after the arguments are
+    # checked; matplotlib, openpyxl and yfinance only when a stage needs them
+    from batch import run_batch
+    from main import REPORTS_DIR
+    from profiling import setup_logging
+    setup_logging(args.verbose)
+
+    reports_dir = Path(options.get('reports_dir', REPORTS_DIR))
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    summary = run_batch(
+        configs,
+        periods=options.get('periods', range(10, 101)),
+        workers=options.get('workers'),
+        max_downloads=options.get('downloads', 2),
+        reports_dir=reports_dir,
+        out_file=Path(options.get('summary', reports_dir / f"{args.jobs.stem}_summary.csv")),
+        cache_dir=options.get('cache_dir'),
+        data_format=options.get('format', 'xlsx'),
+        plots=options.get('plots', True),
+    )
+    print(summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
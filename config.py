@@ -6,3 +6,12 @@ class BacktestConfig:
     start: str                    # Start date in 'YYYY-MM-DD' format
     end: str                      # End date in 'YYYY-MM-DD' format
     transaction_cost: float = 0.003  # Cost per trade (e.g. 0.003 = 0.3%)
+    offline: bool = False         # Serve bars from the local cache only, no downloads
+    benchmarks: dict = None       # {label: ticker} for the comparison chart; None = S&P 500
+    mode: str = 'long-short'      # 'long-short', 'long-only', 'short-only' or 'flat' (see strategy.MODES)
+    interval: str = '1d'          # Yahoo bar size: '1d', '1wk', '1h', '5m', '1m', ...
+    resample: str = None          # Aggregate into coarser bars, e.g. '15min' or '4h' (pandas offset)
+    select: str = 'Cumulative Return %'  # Optimization column the best period is picked by, e.g. 'Sharpe' (see metrics.METRICS)
+    source: str = 'yahoo'         # Data provider: 'yahoo' or 'local' (see providers.get_provider)
+    data_dir: str = None          # Folder with the local provider's npy/Parquet/CSV dumps
+    execution: dict = None        # Fill and cost model, e.g. {'fill': 'next_open', 'spread_bps': 5} (see execution.ExecutionModel); None = flat cost at the close
@@ -1,48 +1,237 @@
 # data.py
-import yfinance as yf
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from providers import YAHOO, DataProvider, bar_name, read_folder
+
+log = logging.getLogger(__name__)
+
+# === local OHLCV cache lives next to the scripts, one folder per symbol ===
+CACHE_DIR = Path(__file__).resolve().parent / 'Cache'
+
+# how each OHLCV column is aggregated into coarser bars
+RESAMPLE = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+            'Adj Close': 'last', 'Volume': 'sum'}
+
 
-def fetch_data(symbol: str, start: str, end: str) -> pd.DataFrame:
+def fetch_data(symbol: str, start: str, end: str,
+               cache_dir: Path = CACHE_DIR, offline: bool = False,
+               interval: str = '1d', columns: list = None,
+               provider: DataProvider = None) -> pd.DataFrame:
     """
-    Download OHLCV data via updated yfinance API.
+    Load OHLCV data from 'provider' (default: Yahoo Finance via yfinance).
+
+    Bars from a remote provider are kept in a local cache under 'cache_dir'
+    (None disables it), so repeated runs only download the head or tail
+    bars the cache is missing. With offline=True nothing is downloaded and
+    only cached bars are served. Local providers (e.g. LocalFileProvider)
+    are read directly, without the cache.
+
+    'interval' is the bar size ('1d', '1wk', '1h', '5m', '1m', ...). Yahoo
+    intraday ranges are split into the chunks Yahoo allows and fetched
+    concurrently. 'columns' limits which columns are read (default: all).
     """
-    print(f"Fetching {symbol} from {start} to {end}...")
-    df = yf.download(
-        tickers=symbol,
-        start=start,
-        end=end,
-        auto_adjust=False,
-        group_by='column',
-        progress=False
-    )
+    provider = provider or YAHOO
+    log.info("Fetching %s %s bars from %s to %s...", symbol, interval, start, end)
+    if cache_dir is None or not provider.remote:
+        df = provider.fetch(symbol, pd.Timestamp(start) if start else None,
+                            pd.Timestamp(end) if end else None, interval, columns)
+        if df.empty:
+            log.info("Range empty; fetching full history for %s.", symbol)
+            df = provider.fetch(symbol, interval=interval, columns=columns)
+            if df.empty:
+                log.warning("No data for %s.", symbol)
+                return df
+        log.debug("Data fetched: \n%s", df)
+        return df
+
+    lo, hi = _requested_range(start, end)
+    if not offline:
+        _refresh_cache(symbol, lo, hi, cache_dir, interval, provider)
+    df, _ = read_cache(symbol, cache_dir, lo, hi, interval, columns)
+    if df.empty and offline:
+        log.info("Range empty; using full cached history for %s.", symbol)
+        df, _ = read_cache(symbol, cache_dir, interval=interval, columns=columns)
+    elif df.empty:
+        log.info("Range empty; fetching full history for %s.", symbol)
+        full = provider.fetch(symbol, interval=interval)
+        if not full.empty:
+            df = _store(symbol, full, (full.index[0].normalize(), _today()), cache_dir, interval)
+            if columns is not None:
+                df = df[columns]
     if df.empty:
-        info = yf.Ticker(symbol).info
-        if not info:
-            print(f"No data for {symbol}.")
-            return df
-        print(f"Range empty; fetching full history for {symbol}.")
-        df = yf.download(
-            tickers=symbol,
-            period="max",
-            auto_adjust=False,
-            group_by='column',
-            progress=False
-        )
-    print(f"Data fetched: \n{df}")
+        log.warning("No data for %s.", symbol)
+        return df
+    log.debug("Data fetched: \n%s", df)
     return df
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    cleaned = df.copy()
-    if isinstance(cleaned.columns, pd.MultiIndex):
-        cleaned.columns = cleaned.columns.droplevel(1)
-    if 'Adj Close' not in cleaned.columns:
+def read_cache(symbol: str, cache_dir: Path = CACHE_DIR,
+               start: pd.Timestamp = None, end: pd.Timestamp = None,
+               interval: str = '1d', columns: list = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Load the cached bars for 'symbol' in [start, end) and the metadata
+    describing which date range the cache covers. Columns are memory-mapped,
+    so only the requested rows (and 'columns', default all) are read from disk.
+    """
+    return read_folder(_symbol_dir(symbol, cache_dir, interval), start, end, columns)
+
+
+def _refresh_cache(symbol: str, lo: pd.Timestamp, hi: pd.Timestamp, cache_dir: Path,
+                   interval: str = '1d', provider: DataProvider = YAHOO):
+    meta = _read_meta(_symbol_dir(symbol, cache_dir, interval))
+    # bars older than the provider keeps cannot be downloaded; don't try
+    earliest = provider.earliest(interval)
+    lo = max(lo, earliest)
+    # nothing cached yet: fetch the whole request
+    if not meta:
+        if lo >= hi:
+            return
+        new = provider.fetch(symbol, lo, hi, interval)
+        if not new.empty:
+            _store(symbol, new, (lo, min(hi, _today())), cache_dir, interval)
+        return
+
+    cov_lo = pd.Timestamp(meta['start'])
+    cov_hi = pd.Timestamp(meta['end'])
+    parts = []
+    # missing head bars
+    if lo < cov_lo:
+        parts.append(provider.fetch(symbol, lo, cov_lo, interval))
+    # missing tail bars (also bridges any gap between the cache and the
+    # request, as far back as the provider still serves bars)
+    if hi > cov_hi:
+        parts.append(provider.fetch(symbol, max(cov_hi, earliest), hi, interval))
+    if not parts:
+        return
+    parts = [p for p in parts if not p.empty]
+    # the covered range grows even when the gap had no bars (weekends, holidays)
+    start = min(lo, cov_lo)
+    if hi > cov_hi and cov_hi < earliest:
+        # the bars between the cache and 'earliest' can no longer be
+        # downloaded, so only the newly fetched span counts as covered
+        start = earliest
+    covered = (start, max(cov_hi, min(hi, _today())))
+    _store(symbol, pd.concat(parts) if parts else None, covered, cache_dir, interval)
+
+
+def _store(symbol: str, new: pd.DataFrame, covered: tuple, cache_dir: Path,
+           interval: str = '1d') -> pd.DataFrame:
+    cached, meta = read_cache(symbol, cache_dir, interval=interval)
+    # newly downloaded bars win over cached ones on the same timestamp
+    merged = cached
+    if new is not None:
+        merged = pd.concat([cached, new]) if meta else new
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    folder = _symbol_dir(symbol, cache_dir, interval)
+    folder.mkdir(parents=True, exist_ok=True)
+    np.save(folder / 'index.npy', merged.index.to_numpy(dtype='datetime64[ns]'))
+    files = {}
+    for i, name in enumerate(merged.columns):
+        fname = f"col{i}.npy"
+        np.save(folder / fname, merged[name].to_numpy())
+        files[name] = fname
+    meta = {
+        'symbol': symbol,
+        'interval': interval,
+        'start': covered[0].strftime('%Y-%m-%d'),
+        'end': covered[1].strftime('%Y-%m-%d'),
+        'columns': files,
+    }
+    # metadata is written last; a cache without it is treated as empty
+    (folder / 'meta.json').write_text(json.dumps(meta, indent=2))
+    return merged
+
+
+def _read_meta(folder: Path) -> dict:
+    meta_file = folder / 'meta.json'
+    if not meta_file.exists():
+        return {}
+    return json.loads(meta_file.read_text())
+
+
+def _requested_range(start: str, end: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+    # yfinance treats 'end' as exclusive; blank dates mean full history / today
+    lo = pd.Timestamp(start) if start else pd.Timestamp('1900-01-01')
+    hi = pd.Timestamp(end) if end else _today() + pd.Timedelta(days=1)
+    return lo, hi
+
+
+def _today() -> pd.Timestamp:
+    # today's bar is still forming, so the cache never counts it as covered
+    return pd.Timestamp.now().normalize()
+
+
+def _symbol_dir(symbol: str, cache_dir: Path, interval: str = '1d') -> Path:
+    # daily bars keep the plain symbol folder; other sizes get their own
+    return Path(cache_dir) / bar_name(symbol, interval)
+
+
+def resample_bars(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    Aggregate OHLCV bars into coarser 'rule' bars (a pandas offset such as
+    '15min', '4h' or '1D'): first Open, highest High, lowest Low, last
+    (Adj) Close and summed Volume. Bars with no price in them are dropped.
+    """
+    agg = {name: RESAMPLE[name] for name in df.columns if name in RESAMPLE}
+    bars = df.resample(rule).agg(agg)
+    prices = [name for name in agg if name != 'Volume']
+    return bars.dropna(how='all', subset=prices)
+
+
+def align_bars(frames: dict, columns: tuple = ('Adj Close', 'High', 'Low'),
+               calendar: str = 'union') -> dict:
+    """
+    Put the bars of several symbols ({symbol: frame}) on one date index:
+    returns {column: DataFrame of dates × symbols}.
+
+    calendar='union' keeps every date any symbol has a bar on, with NaN
+    where a symbol has none (e.g. weekends for stocks next to 24/7 crypto,
+    or dates before a listing); 'intersection' keeps only the dates every
+    symbol has a bar on. Prices are not filled in, so gaps stay visible.
+    """
+    if calendar not in ('union', 'intersection'):
+        raise ValueError(f"Unknown calendar: {calendar}")
+    index = None
+    for df in frames.values():
+        if index is None:
+            index = df.index
+        elif calendar == 'union':
+            index = index.union(df.index)
+        else:
+            index = index.intersection(df.index)
+    index = pd.DatetimeIndex([] if index is None else index, name='Date')
+    return {
+        column: pd.DataFrame({symbol: df[column].reindex(index) for symbol, df in frames.items()},
+                             index=index)
+        for column in columns
+    }
+
+
+def clean_data(df: pd.DataFrame, keep: tuple = ()) -> pd.DataFrame:
+    """
+    Flatten yfinance's column levels, drop the columns the strategy does not
+    use and remove the timezone. 'keep' names any of Volume, Open and Close
+    to retain, e.g. the columns an execution model reads.
+    """
+    columns = df.columns
+    if isinstance(columns, pd.MultiIndex):
+        columns = columns.droplevel(1)
+    if 'Adj Close' not in columns:
         raise KeyError("The 'Adj Close' column is missing from the data.")
-    # Remove unnecessary columns if they exist
-    for col in ["Volume", "Open", "Close"]:
-        if col in cleaned.columns:
-            del cleaned[col]
+    # Keep only the columns the strategy uses; selecting them copies just
+    # those instead of copying the whole frame and deleting the rest,
+    # which matters for millions of intraday bars
+    dropped = {"Volume", "Open", "Close"} - set(keep)
+    selected = [i for i, col in enumerate(columns) if col not in dropped]
+    cleaned = df.iloc[:, selected].copy()
+    cleaned.columns = columns[selected]
     # Remove timezone information
-    cleaned.index = cleaned.index.tz_localize(None)
+    if getattr(cleaned.index, 'tz', None) is not None:
+        cleaned.index = cleaned.index.tz_localize(None)
     return cleaned
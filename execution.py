@@ -0,0 +1,120 @@
+# execution.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+FILLS = ('close', 'next_open')
+
+
+@dataclass(frozen=True)
+class ExecutionModel:
+    """
+    How HiLo orders are filled and what they cost on top of the
+    proportional transaction_cost:
+
+        fill             'close': at the close of the bar that gave the
+                         signal (compute_hilo's default); 'next_open': at
+                         the open of the next bar
+        spread_bps       quoted bid-ask spread in basis points; half of it
+                         is paid on every unit traded
+        impact           slippage of an order worth all of 'capital' that
+                         is x of the bar's traded value: impact × x ** impact_exponent
+        impact_exponent  0.5 is the square-root law, 1 linear
+        fixed_fee        currency per order (a flip from long to short is one)
+        capital          starting capital, in the same currency; sizes the
+                         orders for slippage and fixed fees
+
+    Slippage needs the 'Volume' column (bars without volume slip nothing)
+    and next-open fills need 'Open' and 'Close' (to adjust the open like
+    'Adj Close'); keep them with clean_data(df, keep=model.columns).
+    """
+    fill: str = 'close'
+    spread_bps: float = 0.0
+    impact: float = 0.0
+    impact_exponent: float = 0.5
+    fixed_fee: float = 0.0
+    capital: float = 10_000.0
+
+    def __post_init__(self):
+        if self.fill not in FILLS:
+            raise ValueError(f"Unknown fill: {self.fill}")
+
+    @property
+    def columns(self) -> tuple:
+        """
+        The price columns this model reads besides 'Adj Close'.
+        """
+        columns = []
+        if self.fill == 'next_open':
+            columns += ['Open', 'Close']
+        if self.impact:
+            columns += ['Open' if self.fill == 'next_open' else 'Close', 'Volume']
+        return tuple(dict.fromkeys(columns))
+
+    def costs(self, df: pd.DataFrame, position: np.ndarray,
+              transaction_cost: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        For a (rows × bars) position matrix, where row positions are decided
+        at each bar's close: the gross multiplier of every bar, the
+        proportional costs (transaction_cost, half spread and slippage) as a
+        fraction of the bar's starting equity, and the fixed fees as a
+        fraction of 'capital'.
+        """
+        missing = [c for c in ('Adj Close', *self.columns) if c not in df.columns]
+        if missing:
+            raise KeyError(f"The execution model needs the {missing} columns; "
+                           f"keep them with clean_data(df, keep=model.columns).")
+        position = np.asarray(position, dtype=np.float64)
+        close = df['Adj Close'].to_numpy(dtype=np.float64)
+        filled = _pad(close)
+        # position held over each bar when orders fill at the signal close
+        held = np.zeros_like(position)
+        held[:, 1:] = position[:, :-1]
+
+        if self.fill == 'close':
+            traded = np.zeros_like(position)
+            traded[:, 1:] = np.abs(np.diff(position, axis=1))
+            daily_return = filled[1:] / filled[:-1] - 1
+            strategy_return = np.ones_like(position)
+            strategy_return[:, 1:] = _multiplier(held[:, 1:], 1 + daily_return)
+        else:
+            # an order placed at the close of bar j - 1 fills at the open of
+            # bar j: the older position earns the overnight gap, the new one
+            # the rest of the bar
+            before = np.zeros_like(position)
+            before[:, 2:] = position[:, :-2]
+            traded = np.abs(held - before)
+            adj_open = df['Open'].to_numpy(dtype=np.float64) * filled / _pad(
+                df['Close'].to_numpy(dtype=np.float64))
+            gap = adj_open[1:] / filled[:-1]
+            rest = filled[1:] / adj_open[1:]
+            strategy_return = np.ones_like(position)
+            strategy_return[:, 1:] = (_multiplier(before[:, 1:], gap)
+                                      * _multiplier(held[:, 1:], rest))
+
+        rate = transaction_cost + self.spread_bps / 2e4
+        if self.impact:
+            price = df['Open' if self.fill == 'next_open' else 'Close'].to_numpy(dtype=np.float64)
+            volume = df['Volume'].to_numpy(dtype=np.float64)
+            value = price * volume
+            known = np.isfinite(value) & (value > 0)
+            share = traded * self.capital / np.where(known, value, np.inf)
+            rate = rate + self.impact * share ** self.impact_exponent
+        # same operation order as hilo_returns, so the default model matches it
+        cost_pct = traded * close * rate / close
+        fixed = (traded > 0) * (self.fixed_fee / self.capital)
+        return strategy_return, cost_pct, fixed
+
+
+def _multiplier(position: np.ndarray, ratio: np.ndarray) -> np.ndarray:
+    # growth of a long / short / flat position over a price ratio
+    return np.where(position == 1, ratio, np.where(position == -1, 1 / ratio, 1.0))
+
+
+def _pad(values: np.ndarray) -> np.ndarray:
+    # carry the last price over missing ones, like pct_change() does
+    if not np.isnan(values).any():
+        return values
+    last = np.where(~np.isnan(values), np.arange(len(values)), 0)
+    return values[np.maximum.accumulate(last)]
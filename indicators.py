@@ -0,0 +1,110 @@
+# indicators.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class IndicatorCache:
+    """
+    Least-recently-used store of rolling indicator arrays.
+
+    Entries are keyed by (data fingerprint, column, window, method) and the
+    total size is kept under 'max_bytes' by dropping the oldest entries.
+    Stored arrays are read-only; hits and misses are counted for tuning.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, *keys: tuple):
+        """
+        Return the array stored under the first of 'keys' present (counted
+        as one hit), or None (one miss).
+        """
+        return self.find(*keys)[1]
+
+    def find(self, *keys: tuple) -> tuple:
+        """
+        Like get(), but returns (matched key, array) or (None, None).
+        """
+        with self._lock:
+            for key in keys:
+                values = self._entries.get(key)
+                if values is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, values
+            self.misses += 1
+            return None, None
+
+    def put(self, key: tuple, values: np.ndarray) -> np.ndarray:
+        values = np.array(values, dtype=np.float64)
+        values.flags.writeable = False
+        if values.nbytes > self.max_bytes:
+            return values
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = values
+            self._bytes += values.nbytes
+            # evict least recently used entries until we fit again
+            while self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= dropped.nbytes
+        return values
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# shared by compute_hilo and the optimizer sweep for the whole process
+CACHE = IndicatorCache()
+
+
+def fingerprint(values: np.ndarray) -> str:
+    """
+    Content hash of an array: equal data gives the same key even when it
+    comes from a different DataFrame (e.g. a fresh download).
+    """
+    values = np.ascontiguousarray(values)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{values.dtype}{values.shape}".encode())
+    h.update(values.view(np.uint8))
+    return h.hexdigest()
+
+
+def rolling_mean(series: pd.Series, window: int, cache: IndicatorCache = CACHE) -> np.ndarray:
+    """
+    series.rolling(window).mean() as a read-only array, served from 'cache'
+    when the same data and window were seen before (None disables caching).
+    """
+    if cache is None:
+        return series.rolling(window=window).mean().to_numpy()
+    key = (fingerprint(series.to_numpy()), series.name, window, 'mean')
+    values = cache.get(key)
+    if values is None:
+        values = cache.put(key, series.rolling(window=window).mean().to_numpy())
+    return values
@@ -0,0 +1,182 @@
+# live.py
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class RollingMean:
+    """
+    O(1)-per-update rolling mean over a fixed window.
+
+    Mirrors pandas' rolling(window).mean() step for step (compensated running
+    sum, NaN-aware counts, repeated-value and sign guards), so values match
+    the batch calculation exactly.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def update(self, val: float) -> float:
+        # a window of one never overlaps the previous one: pandas starts over
+        if self.window == 1:
+            self.values.clear()
+            self.nobs = self.neg_ct = self.same_ct = 0
+            self.sum_x = self.comp_add = self.comp_remove = 0.0
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self._add(val)
+
+        if self.nobs < self.window:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def _add(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        # count repeated values so a constant window returns that value exactly
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+
+    def _remove(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+
+class HiLoStream:
+    """
+    Incremental HiLo strategy for live bar updates.
+
+    Keeps only the rolling High/Low windows, the previous averages, the last
+    position and the running gross/net equity, so each new bar costs O(1).
+    Replaying a history through update() gives the same values as
+    compute_hilo over that history.
+    """
+
+    def __init__(self, period: int, transaction_cost: float):
+        self.period = period
+        self.transaction_cost = transaction_cost
+        self.avg_hi = RollingMean(period)
+        self.avg_lo = RollingMean(period)
+        self.prev_avg_hi = math.nan
+        self.prev_avg_lo = math.nan
+        self.position = 0.0
+        self.prev_position = math.nan
+        self.last_close = math.nan
+        self.equity = 1.0
+        self.equity_net = 1.0
+        self.total_trades = 0.0
+        self.total_fees = 0.0
+        self.bars = 0
+
+    def update(self, high: float, low: float, adj_close: float) -> dict:
+        """
+        Feed one bar and return its row of compute_hilo columns.
+        """
+        avg_hi = self.avg_hi.update(high)
+        avg_lo = self.avg_lo.update(low)
+
+        # buy above yesterday's Avg Hi, sell below yesterday's Avg Lo
+        signal = math.nan
+        if adj_close > self.prev_avg_hi:
+            signal = 1.0
+        if adj_close < self.prev_avg_lo:
+            signal = -1.0
+        # carry the last signal forward as the current position
+        if not math.isnan(signal):
+            self.position = signal
+
+        trade_qty = abs(self.position - self.prev_position) if self.bars else 0.0
+        cost = trade_qty * adj_close * self.transaction_cost
+        cost_pct = cost / adj_close
+
+        # pct_change() pads a missing price with the last known one
+        close = adj_close if not math.isnan(adj_close) else self.last_close
+        daily_return = close / self.last_close - 1 if self.bars else math.nan
+
+        if self.prev_position == 1:
+            strategy_return = 1 + daily_return
+        elif self.prev_position == -1:
+            strategy_return = 1 / (1 + daily_return)
+        else:
+            strategy_return = 1.0
+        net_return = strategy_return - cost_pct
+
+        # cumprod skips missing values: the curve shows NaN but carries on
+        cum_gross = math.nan
+        if not math.isnan(strategy_return):
+            self.equity *= strategy_return
+            cum_gross = self.equity
+        cum_net = math.nan
+        if not math.isnan(net_return):
+            self.equity_net *= net_return
+            cum_net = self.equity_net
+
+        if not math.isnan(trade_qty):
+            self.total_trades += trade_qty
+        if not math.isnan(cost):
+            self.total_fees += cost
+
+        self.prev_avg_hi = avg_hi
+        self.prev_avg_lo = avg_lo
+        self.prev_position = self.position
+        self.last_close = close
+        self.bars += 1
+        return {
+            'Avg Hi': avg_hi,
+            'Avg Lo': avg_lo,
+            'Signal': signal,
+            'Position': self.position,
+            'Cost': cost,
+            'Cost Pct': cost_pct,
+            'Daily Return': daily_return,
+            'Strategy Return': strategy_return,
+            'Cumulative Return': cum_gross,
+            'Net Strategy Return': net_return,
+            'Cumulative Return (net)': cum_net,
+        }
+
+    def update_many(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feed a micro-batch of bars ('High', 'Low', 'Adj Close' columns) and
+        return their rows as a DataFrame on the same index.
+        """
+        high = bars['High'].to_numpy(dtype=np.float64)
+        low = bars['Low'].to_numpy(dtype=np.float64)
+        close = bars['Adj Close'].to_numpy(dtype=np.float64)
+        rows = [self.update(h, l, c) for h, l, c in zip(high, low, close)]
+        return pd.DataFrame(rows, index=bars.index)
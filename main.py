@@ -1,66 +1,173 @@
 # main.py
+import argparse
+import dataclasses
+import hashlib
+import json
+import logging
+import os
 from pathlib import Path
+import pandas as pd
 from config import BacktestConfig
-from data import fetch_data, clean_data
+from data import fetch_data, clean_data, resample_bars
+from execution import ExecutionModel
+from providers import get_provider
 from optimize import optimize_hilo, get_best
 from strategy import compute_hilo
-from report import plot_results, plot_comparison, save_to_excel, plot_signals_with_returns
+from benchmark_data import PROVIDER
+from profiling import Profiler, setup_logging, stage
+from results import RESULTS, ResultStore
 
+log = logging.getLogger(__name__)
 
-def main():
-    cfg = BacktestConfig(symbol='CRV-USD', start='2020-07-06',
-                         end='2025-07-06', transaction_cost=0.003)
-    raw = fetch_data(cfg.symbol, cfg.start, cfg.end)
-    if raw.empty:
-        print("No data fetched; exiting.")
-        return
-    clean_df = clean_data(raw)
+# ensure Reports folder lives next to your script
+REPORTS_DIR = Path(__file__).resolve().parent / 'Reports'
+
+
+def run_backtest(cfg: BacktestConfig, raw: pd.DataFrame, periods: range = range(10, 101),
+                 reports_dir: Path = REPORTS_DIR, data_format: str = 'xlsx',
+                 plot_workers: int = 1, store: ResultStore = RESULTS,
+                 plots: bool = True) -> dict:
+    """
+    Clean, optimize, backtest the best period and write the Excel report
+    for already fetched data. Returns a one-row summary of the run.
+
+    data_format='csv' or 'parquet' writes the per-bar data next to the
+    report instead of into its Data sheet, and 'summary' writes no report
+    at all. With plot_workers > 1 the charts are drawn in parallel
+    processes; plots=False leaves them out of the report. Sweep results
+    are kept in 'store' (None: not kept), so re-running the same data and
+    settings skips the sweep and an interrupted one resumes.
+    """
+    execution = ExecutionModel(**cfg.execution) if cfg.execution else None
+    with stage('clean_data', rows=len(raw)):
+        clean_df = clean_data(raw, keep=execution.columns if execution else ())
     # build filename using dates from df.index
     start_date = clean_df.index[0].strftime('%Y-%m-%d')
     end_date = clean_df.index[-1].strftime('%Y-%m-%d')
 
-    opt = optimize_hilo(clean_df, range(10, 101), cfg.transaction_cost)
-    best, ret = get_best(opt)
-    print(f"Optimal HiLo: {best} days → Return: {ret:.2f}x")
-    final = compute_hilo(clean_df, best, cfg.transaction_cost)
+    with stage('optimize_hilo', rows=len(clean_df) * len(periods)):
+        opt = optimize_hilo(clean_df, periods, cfg.transaction_cost,
+                            modes=[cfg.mode], metrics=True, store=store,
+                            symbol=cfg.symbol, execution=execution).drop(columns='Mode')
+    best, value = get_best(opt, cfg.select)
+    log.info("Optimal HiLo: %d days → %s: %.2f", best, cfg.select, value)
+    # the optimizer's metrics of the chosen period
+    row = opt[opt['HiLo'] == best].iloc[0]
+    summary = {
+        'Symbol': cfg.symbol,
+        'Mode': cfg.mode,
+        'Start': start_date,
+        'End': end_date,
+        'Best HiLo': best,
+        'Cumulative Return': float(row['Cumulative Return %']),
+        'Cumulative Return (net)': float(row['Cumulative Return (net) %']),
+        'Sharpe': float(row['Sharpe']),
+        'Max Drawdown': float(row['Max Drawdown']),
+        'Trades': int(row['Trades']),
+        'Report': None,
+    }
+    if data_format == 'summary':
+        return summary
+
+    # matplotlib and openpyxl are only loaded when a report is written
+    from report import EXCEL_MAX_ROWS, render_charts, save_to_excel
+    with stage('compute_hilo', rows=len(clean_df)):
+        final = compute_hilo(clean_df, best, cfg.transaction_cost, mode=cfg.mode,
+                             execution=execution)
     # Add HiLo period metadata column
     final['HiLo Period'] = best
 
-    reports_dir = Path(__file__).parent / 'Reports'
-    reports_dir.mkdir(exist_ok=True)
-
-    # 1) ensure Reports folder lives next to your script
-    R = Path(__file__).resolve().parent / 'Reports'
+    R = Path(reports_dir)
     R.mkdir(exist_ok=True)
 
-    # 2) build three filenames
-    p1 = R / f"{cfg.symbol}_{start_date}_{end_date}_opt.png"
-    p2 = R / f"{cfg.symbol}_{start_date}_{end_date}_cmp.png"
-    p3 = R / f"{cfg.symbol}_{start_date}_{end_date}_signals.png"
+    # 1) draw the three charts straight to PNG bytes, no temporary files
+    pngs = []
+    if plots:
+        with stage('render_charts'):
+            pngs = render_charts(opt, final, best, cfg.symbol,
+                                 benchmarks=cfg.benchmarks, workers=plot_workers)
 
-    # 3) save each chart
-    plot_results(opt,   cfg.symbol, out_file=p1)
-    plot_comparison(final, best,     cfg.symbol, out_file=p2)
-    plot_signals_with_returns(final, best, cfg.symbol, out_file=p3)
+    # 2) write your Excel and embed all three
+    excel_file = R / f"{report_name(cfg, start_date, end_date)}_report.xlsx"
+    if data_format == 'xlsx' and len(final) > EXCEL_MAX_ROWS:
+        log.warning("%d bars do not fit in an Excel sheet; writing the data as CSV.", len(final))
+        data_format = 'csv'
+    with stage('save_to_excel', rows=len(final)):
+        save_to_excel(
+            df=final,
+            opt_df=opt,
+            imgs=pngs,
+            out_path=excel_file,
+            data_format=data_format
+        )
 
-    # 4) write your Excel and embed all three
-    excel_file = R / f"{cfg.symbol}_{start_date}_{end_date}_report.xlsx"
-    save_to_excel(
-        df=final,
-        opt_df=opt,
-        imgs=[p1, p2, p3],
-        out_path=excel_file
-    )
+    log.info("Report generated: %s", excel_file)
+    summary['Report'] = str(excel_file)
+    return summary
+
+
+def report_name(cfg: BacktestConfig, start_date: str, end_date: str) -> str:
+    # one report per distinct config in a batch: the mode is always in the
+    # name, other non-default settings (cost, bar size, execution model, ...)
+    # as a short hash of their values
+    name = f"{cfg.symbol}_{cfg.mode}_{start_date}_{end_date}"
+    varying = {f.name: getattr(cfg, f.name) for f in dataclasses.fields(cfg)
+               if f.name not in ('symbol', 'start', 'end', 'mode', 'offline')
+               and getattr(cfg, f.name) != f.default}
+    if varying:
+        text = json.dumps(varying, sort_keys=True, default=str)
+        name += '_' + hashlib.blake2b(text.encode(), digest_size=4).hexdigest()
+    return name
+
+
+def main(profile: Path = None, memory: bool = False, cprofile: bool = False,
+         cfg: BacktestConfig = None):
+    """
+    Backtest 'cfg' (default: the example config below; cli.py runs job
+    files). With 'profile' the time, CPU, rows, bytes and (with
+    memory=True) peak memory of every stage are written to that JSON file;
+    cprofile=True adds a cProfile next to it.
+    """
+    from report import CHARTS
+    cfg = cfg or BacktestConfig(symbol='CRV-USD', start='2020-07-06',
+                                end='2025-07-06', transaction_cost=0.003)
+    provider = get_provider(cfg.source, cfg.data_dir)
+    with Profiler(memory=memory, cprofile=cprofile) as prof:
+        with stage('fetch_data') as record:
+            raw = fetch_data(cfg.symbol, cfg.start, cfg.end, offline=cfg.offline,
+                             interval=cfg.interval, provider=provider)
+            if cfg.resample:
+                raw = resample_bars(raw, cfg.resample)
+            if record is not None:
+                record['rows'] = len(raw)
+        summary = None
+        if not raw.empty:
+            # the chart benchmarks come from the same source as the prices
+            PROVIDER.use(provider)
+            PROVIDER.offline = cfg.offline
+            summary = run_backtest(cfg, raw, plot_workers=min(len(CHARTS), os.cpu_count() or 1))
+    if summary is None:
+        print("No data fetched; exiting.")
+    else:
+        print(f"Optimal HiLo: {summary['Best HiLo']} days → Return: {summary['Cumulative Return']:.2f}x")
+        print(f"Report generated: {summary['Report']}")
+    # an empty fetch is profiled too; it is often the slow run to diagnose
+    if profile:
+        prof.save(profile)
+        print(prof.to_frame()[['stage', 'wall_s', 'cpu_s', 'rows', 'bytes']].to_string(index=False))
 
-    print(f"Report generated: {excel_file}")
 
-    # delete the temporary plot files
-    for img in [p1, p2, p3]:
-        try:
-            img.unlink()
-        except OSError:
-            pass
+def _cli():
+    parser = argparse.ArgumentParser(description='Backtest the HiLo strategy.')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='-v for progress messages, -vv for debug output')
+    parser.add_argument('--profile', type=Path, help='write per-stage timings to this JSON file')
+    parser.add_argument('--memory', action='store_true', help='also record peak memory per stage (slower)')
+    parser.add_argument('--cprofile', action='store_true', help='also capture a cProfile (needs --profile)')
+    args = parser.parse_args()
+    setup_logging(args.verbose)
+    main(args.profile, args.memory, args.cprofile)
 
 
 if __name__ == '__main__':
-    main()
+    _cli()
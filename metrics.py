@@ -0,0 +1,121 @@
+# metrics.py
+import numpy as np
+import pandas as pd
+
+# columns added by hilo_metrics, in table order
+METRICS = ('CAGR', 'Sharpe', 'Sortino', 'Max Drawdown', 'Max Drawdown Bars',
+           'Win Rate', 'Exposure', 'Turnover', 'Trades')
+# metrics where the smallest value is the best one (see optimize.get_best)
+LOWER_IS_BETTER = ('Max Drawdown Bars', 'Turnover', 'Trades')
+
+
+def hilo_metrics(position: np.ndarray, curve: np.ndarray, bars_per_year: float = 252.0) -> dict:
+    """
+    Performance metrics for every row of a (... × bars) equity curve and
+    the matching positions, e.g. the (periods × bars) or (modes × periods ×
+    bars) matrices of hilo_matrix. Returns {metric: array} with one value
+    per row, computed for all rows at once:
+
+        CAGR                compound annual growth rate (0.12 = 12% a year)
+        Sharpe, Sortino     annualized, per-bar returns, no risk-free rate
+        Max Drawdown        deepest fall from a previous high (-0.3 = -30%)
+        Max Drawdown Bars   longest stretch of bars below a previous high
+        Win Rate            share of trades that grew the curve
+        Exposure            share of bars with a long or short position
+        Turnover            position units traded per year
+        Trades              entries into a long or short position
+
+    A trade lasts from the bar a position is taken to the bar it changes;
+    fees are counted on the bar they are paid. Bars with a NaN equity
+    value keep the previous value.
+    """
+    shape = curve.shape[:-1]
+    n = curve.shape[-1]
+    curve = ffill_curves(curve.reshape(-1, n))
+    position = position.reshape(-1, n)
+    rows = len(curve)
+    years = (n - 1) / bars_per_year
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = curve[:, 1:] / curve[:, :-1]
+        returns = ratio - 1
+        mean = returns.mean(axis=1)
+        std = returns.std(axis=1, ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2, axis=1))
+        sharpe = np.where(std > 0, mean / std, np.nan) * np.sqrt(bars_per_year)
+        sortino = np.where(downside > 0, mean / downside, np.nan) * np.sqrt(bars_per_year)
+        cagr = curve[:, -1] ** (1 / years) - 1 if years > 0 else np.full(rows, np.nan)
+
+        # drawdowns against the running high, and how long each lasted
+        peak = np.maximum.accumulate(curve, axis=1)
+        drawdown = curve / peak - 1
+        bars = np.arange(n)
+        last_high = np.where(curve < peak, 0, bars)
+        np.maximum.accumulate(last_high, axis=1, out=last_high)
+
+        # bar t's return is earned by the position held at bar t - 1; every
+        # run of equal held positions is one trade (or one flat stretch)
+        held = position[:, :-1]
+        starts = np.ones(held.shape, dtype=bool)
+        starts[:, 1:] = held[:, 1:] != held[:, :-1]
+        segment = np.cumsum(starts.ravel()) - 1
+        growth = np.bincount(segment, weights=np.log(ratio).ravel())
+        in_trade = held[starts] != 0
+        row = np.repeat(np.arange(rows), starts.sum(axis=1))
+        trades_held = np.bincount(row, weights=in_trade, minlength=rows)
+        wins = np.bincount(row, weights=in_trade & (growth > 0), minlength=rows)
+        win_rate = np.where(trades_held > 0, wins / trades_held, np.nan)
+
+        traded = np.abs(position[:, 0]) + np.abs(np.diff(position, axis=1)).sum(axis=1)
+        turnover = traded / years if years > 0 else np.full(rows, np.nan)
+
+    values = {
+        'CAGR': cagr,
+        'Sharpe': sharpe,
+        'Sortino': sortino,
+        'Max Drawdown': drawdown.min(axis=1),
+        'Max Drawdown Bars': (bars - last_high).max(axis=1),
+        'Win Rate': win_rate,
+        'Exposure': (position != 0).mean(axis=1),
+        'Turnover': turnover,
+        'Trades': count_trades(position),
+    }
+    return {name: v.reshape(shape) for name, v in values.items()}
+
+
+def count_trades(position: np.ndarray) -> np.ndarray:
+    """
+    Entries into a long or short position along the last axis: a position
+    on the first bar, and every change to a non-zero position after that.
+    """
+    position = np.asarray(position)
+    # the first bar has no previous position, so any position there counts
+    entries = position[..., :1] != 0
+    flips = (position[..., 1:] != position[..., :-1]) & (position[..., 1:] != 0)
+    return entries.sum(axis=-1) + flips.sum(axis=-1)
+
+
+def bars_per_year(index: pd.Index) -> float:
+    """
+    Average number of bars per year in a DatetimeIndex, for annualizing
+    (about 252 for stock days, 365 for crypto days). 252 if unknown.
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return 252.0
+    days = (index[-1] - index[0]) / pd.Timedelta(days=1)
+    return (len(index) - 1) / (days / 365.25) if days > 0 else 252.0
+
+
+def ffill_curves(curves: np.ndarray) -> np.ndarray:
+    """
+    Carry the last value of each (rows × bars) equity curve over NaN bars,
+    which leave the running product unchanged; leading NaNs become 1.
+    """
+    nan = np.isnan(curves)
+    if not nan.any():
+        return curves
+    last = np.where(nan, 0, np.arange(curves.shape[1]))
+    np.maximum.accumulate(last, axis=1, out=last)
+    out = np.take_along_axis(curves, last, axis=1)
+    out[np.isnan(out)] = 1.0
+    return out
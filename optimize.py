@@ -1,31 +1,173 @@
 # optimize.py
+import numpy as np
 import pandas as pd
-from strategy import compute_hilo
+from metrics import LOWER_IS_BETTER, METRICS, bars_per_year, count_trades, hilo_metrics
+from results import ResultStore, data_key
+from execution import ExecutionModel
+from strategy import hilo_matrix
 
 
-def optimize_hilo(df: pd.DataFrame, periods: range, transaction_cost: float) -> pd.DataFrame:
+def optimize_hilo(df: pd.DataFrame, periods: range, transaction_cost: float,
+                  max_cells: int = 2_000_000, progress=None, modes=None,
+                  metrics: bool = False, store: ResultStore = None,
+                  symbol: str = None, execution: ExecutionModel = None) -> pd.DataFrame:
     """
     Test a range of HiLo periods and return a DataFrame of final 
     gross and net cumulative returns.
+
+    All periods are evaluated together as a (periods × bars) matrix;
+    'max_cells' caps the size of each block to bound memory. If given,
+    progress(done, total) is called after each block; it may raise to
+    abort the sweep.
+
+    With a list of 'modes' (see strategy.MODES) every mode × period
+    combination is swept in the same pass and the table gets a leading
+    'Mode' column, one row per combination.
+
+    metrics=True adds the metrics.METRICS columns (Sharpe, Max Drawdown,
+    ...) of every net equity curve, computed block by block in the same pass.
+
+    With a results.ResultStore 'store', every block is saved under 'symbol'
+    as soon as it is done and periods already in the store are not swept
+    again, so an interrupted sweep resumes where it stopped.
+
+    An 'execution' model (see execution.ExecutionModel) prices every
+    period's fills and costs inside the same batched pass.
     """
-    records = []
-    for p in periods:
-        res = compute_hilo(df, p, transaction_cost)
-        gross_end = res['Cumulative Return'].iloc[-1]
-        net_end = res['Cumulative Return (net)'].iloc[-1]
-        records.append({
-            'HiLo': p,
-            'Cumulative Return %': gross_end,
-            'Cumulative Return (net) %': net_end
-        })
-    return pd.DataFrame(records)
-
-
-def get_best(results: pd.DataFrame) -> tuple[int, float]:
+    per_year = bars_per_year(df.index)
+    columns = ['HiLo', 'Cumulative Return %', 'Cumulative Return (net) %']
+    return _sweep(df, periods, transaction_cost, max_cells, modes,
+                  columns + (list(METRICS) if metrics else []),
+                  lambda res: _metrics(res, per_year) if metrics else None,
+                  progress, store, symbol, execution)
+
+
+def summarize_hilo(df: pd.DataFrame, periods: range, transaction_cost: float,
+                   max_cells: int = 2_000_000, modes=None, metrics: bool = False,
+                   store: ResultStore = None, symbol: str = None,
+                   execution: ExecutionModel = None) -> pd.DataFrame:
+    """
+    Summary-only sweep: final gross/net returns plus the number of trades
+    (entries into a long or short position, as counted in the Excel report)
+    per period. Only one block of periods is held in memory at a time and no
+    per-bar DataFrames are built. 'modes', 'metrics', 'store' and
+    'execution' work as in optimize_hilo.
+    """
+    per_year = bars_per_year(df.index)
+    columns = ['HiLo', 'Cumulative Return %', 'Cumulative Return (net) %']
+    return _sweep(df, periods, transaction_cost, max_cells, modes,
+                  columns + (list(METRICS) if metrics else ['Trades']),
+                  lambda res: (_metrics(res, per_year) if metrics
+                               else {'Trades': count_trades(res['Position'])}),
+                  None, store, symbol, execution)
+
+
+def _sweep(df: pd.DataFrame, periods: range, transaction_cost: float, max_cells: int, modes,
+           columns: list, extra, progress=None, store: ResultStore = None,
+           symbol: str = None, execution: ExecutionModel = None) -> pd.DataFrame:
+    # sweep the periods block by block, extra(res) adding columns to each
+    # block; with a store, only the periods it lacks are swept
+    periods = np.asarray(list(periods), dtype=np.int64)
+    variants = list(modes) if modes is not None else ['long-short']
+    todo = periods
+    if store is not None:
+        data = data_key(df)
+        # results under an execution model are stored apart from flat-cost ones
+        keys = {m: m for m in variants}
+        if execution is not None:
+            data = data_key(df, ('Adj Close', 'High', 'Low', *execution.columns))
+            keys = {m: f"{m} {execution!r}" for m in variants}
+        stored = {m: store.load(symbol, data, keys[m], transaction_cost, columns[1:])
+                  for m in variants}
+        missing = [any(int(p) not in stored[m] for m in variants) for p in periods]
+        todo = periods[np.asarray(missing, dtype=bool)]
+    parts = []
+    done = len(periods) - len(todo)
+    if progress is not None and done:
+        progress(done, len(periods))
+    for block, res in _sweep_blocks(df, todo, transaction_cost, max_cells, modes, execution):
+        table = _block_table(block, res, modes, extra(res))
+        if store is not None:
+            for m in variants:
+                rows = table if modes is None else table[table['Mode'] == m].drop(columns='Mode')
+                store.save(symbol, data, keys[m], transaction_cost, rows)
+        parts.append(table)
+        done += len(block)
+        if progress is not None:
+            progress(done, len(periods))
+    if len(todo) == len(periods):
+        return _concat(parts, modes, columns)
+
+    # stored periods first, then everything back in the requested order
+    reused = periods[~np.isin(periods, todo)]
+    records = [{**({'Mode': m} if modes is not None else {}), 'HiLo': int(p), **stored[m][int(p)]}
+               for m in variants for p in reused]
+    parts.insert(0, pd.DataFrame.from_records(
+        records, columns=(['Mode'] if modes is not None else []) + columns))
+    table = pd.concat(parts, ignore_index=True)
+    rank = table['HiLo'].map({int(p): i for i, p in enumerate(periods)}).to_numpy()
+    if modes is not None:
+        rank = rank + table['Mode'].map({m: i for i, m in enumerate(variants)}).to_numpy() * len(periods)
+    return table.iloc[np.argsort(rank, kind='stable')].reset_index(drop=True)
+
+
+def _sweep_blocks(df: pd.DataFrame, periods: np.ndarray, transaction_cost: float, max_cells: int,
+                  modes=None, execution: ExecutionModel = None):
+    # yield (periods, hilo_matrix result) for blocks of at most max_cells cells
+    per_period = max(len(df), 1) * (len(modes) if modes is not None else 1)
+    block = max(1, max_cells // per_period)
+    for i in range(0, len(periods), block):
+        yield periods[i:i + block], hilo_matrix(df, periods[i:i + block], transaction_cost,
+                                                modes=modes, execution=execution)
+
+
+def _metrics(res: dict, per_year: float) -> dict:
+    # metrics of the net curves, one value per (mode ×) period
+    return hilo_metrics(res['Position'], res['Cumulative Return (net)'], per_year)
+
+
+def _block_table(block: np.ndarray, res: dict, modes, extra: dict = None) -> pd.DataFrame:
+    # final returns of one block; with modes the (modes × periods) values
+    # are flattened mode by mode next to a Mode column
+    columns = {
+        'HiLo': block,
+        'Cumulative Return %': res['Cumulative Return'][..., -1],
+        'Cumulative Return (net) %': res['Cumulative Return (net)'][..., -1],
+        **(extra or {}),
+    }
+    if modes is None:
+        return pd.DataFrame(columns)
+    columns['HiLo'] = np.tile(block, len(modes))
+    table = pd.DataFrame({'Mode': np.repeat(list(modes), len(block)),
+                          **{k: np.ravel(v) for k, v in columns.items()}})
+    return table
+
+
+def _concat(parts: list, modes, columns: list) -> pd.DataFrame:
+    if modes is not None:
+        columns = ['Mode'] + columns
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    table = pd.concat(parts, ignore_index=True)
+    if modes is not None and len(parts) > 1:
+        # blocks hold every mode; regroup the rows mode by mode
+        order = {mode: i for i, mode in enumerate(modes)}
+        table = table.sort_values('Mode', key=lambda s: s.map(order), kind='stable')
+        table = table.reset_index(drop=True)
+    return table
+
+
+def get_best(results: pd.DataFrame, select: str = 'Cumulative Return %') -> tuple[int, float]:
     """
-    Return the HiLo period with the highest cumulative return and its return.
+    Return the HiLo period with the best 'select' value (default: the
+    highest cumulative return) and that value. Any column of the table can
+    be used, e.g. 'Sharpe' from optimize_hilo(..., metrics=True); for
+    metrics.LOWER_IS_BETTER columns the smallest value wins.
     """
-    idx = results['Cumulative Return %'].idxmax()
+    if select not in results.columns:
+        raise KeyError(f"Unknown selection column: {select}")
+    column = results[select]
+    idx = column.idxmin() if select in LOWER_IS_BETTER else column.idxmax()
     best_period = int(results.loc[idx, 'HiLo'])
-    best_return = float(results.loc[idx, 'Cumulative Return %'])
-    return best_period, best_return
+    best_value = float(results.loc[idx, select])
+    return best_period, best_value
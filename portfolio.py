@@ -0,0 +1,137 @@
+# portfolio.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from data import align_bars
+from metrics import bars_per_year, count_trades, hilo_metrics
+from strategy import hilo_panel
+
+
+@dataclass
+class PortfolioResult:
+    """
+    Outcome of backtest_portfolio, all on the shared calendar:
+
+        equity     'Cumulative Return', 'Cumulative Return (net)' and the
+                   'Fees' paid each bar (HiLo trades and rebalancing), as
+                   fractions of the starting capital
+        sleeves    net growth of each symbol's own HiLo curve
+        positions  each symbol's position (1 long, -1 short, 0 flat)
+        weights    the capital share of every symbol
+    """
+    equity: pd.DataFrame
+    sleeves: pd.DataFrame
+    positions: pd.DataFrame
+    weights: pd.Series
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per symbol and one for the portfolio: weight, final net
+        growth, CAGR, Sharpe, max drawdown and trades.
+        """
+        per_year = bars_per_year(self.equity.index)
+        position = self.positions.to_numpy().T
+        curves = np.vstack([self.sleeves.to_numpy().T,
+                            self.equity['Cumulative Return (net)'].to_numpy()])
+        # the portfolio is in the market whenever any symbol is
+        held = np.vstack([position, (position != 0).any(axis=0)])
+        values = hilo_metrics(held, curves, per_year)
+        trades = count_trades(position)
+        table = pd.DataFrame({
+            'Weight': np.append(self.weights.to_numpy(), self.weights.sum()),
+            'Cumulative Return (net)': curves[:, -1],
+            'CAGR': values['CAGR'],
+            'Sharpe': values['Sharpe'],
+            'Max Drawdown': values['Max Drawdown'],
+            'Trades': np.append(trades, trades.sum()),
+        }, index=pd.Index([*self.weights.index, 'Portfolio'], name='Symbol'))
+        return table
+
+
+def backtest_portfolio(
+    frames: dict,
+    period,
+    transaction_cost: float,
+    weights: dict = None,
+    calendar: str = 'union',
+    rebalance: bool = False,
+    mode: str = 'long-short',
+    lo_period=None,
+    band: float = 0.0
+) -> PortfolioResult:
+    """
+    Trade HiLo on a basket of symbols ({symbol: cleaned OHLC frame}) and
+    combine them into one portfolio.
+
+    'period' is one HiLo period for every symbol or {symbol: period} (same
+    for 'lo_period'). 'weights' ({symbol: weight}, default equal) are
+    scaled to sum to 1. With rebalance=False each symbol's share of the
+    capital grows on its own (buy-and-hold sleeves); with rebalance=True
+    the weights are restored every bar. Fees are charged inside each
+    symbol's curve, in proportion to its weight; rebalancing also pays
+    'transaction_cost' on the value traded to restore the weights.
+
+    The symbols are aligned on one calendar (see data.align_bars) and all
+    of them are backtested in one pass over the (symbols × dates) arrays.
+    A symbol's share stays in cash before its first bar.
+    """
+    symbols = list(frames)
+    panel = align_bars(frames, calendar=calendar)
+    close = panel['Adj Close'].to_numpy(dtype=np.float64).T
+    high = panel['High'].to_numpy(dtype=np.float64).T
+    low = panel['Low'].to_numpy(dtype=np.float64).T
+    res = hilo_panel(close, high, low, _per_symbol(period, symbols), transaction_cost,
+                     None if lo_period is None else _per_symbol(lo_period, symbols),
+                     band, mode)
+
+    w = np.ones(len(symbols)) if weights is None else np.array(
+        [float(weights.get(s, 0.0)) for s in symbols])
+    unknown = set(weights or {}) - set(symbols)
+    if unknown:
+        raise KeyError(f"Weights for symbols not in the basket: {sorted(unknown)}")
+    if w.sum() <= 0:
+        raise ValueError('Portfolio weights must add up to more than 0.')
+    w = w / w.sum()
+
+    gross = res['Strategy Return']
+    net = gross - res['Cost Pct']
+    if rebalance:
+        # every bar starts from the target weights again: the sleeves drift
+        # apart over a bar and trading them back to 'w' costs
+        # transaction_cost on that turnover (nothing after the last bar)
+        growth = w @ net
+        drift = w[:, None] * net / growth
+        turnover = np.abs(drift - w[:, None]).sum(axis=0)
+        turnover[-1:] = 0.0
+        equity = np.cumprod(w @ gross)
+        equity_net = np.cumprod(growth * (1 - transaction_cost * turnover))
+        start = np.concatenate(([1.0], equity_net[:-1]))
+        fees = start * (w @ res['Cost Pct'] + growth * transaction_cost * turnover)
+    else:
+        equity = w @ res['Cumulative Return']
+        equity_net = w @ res['Cumulative Return (net)']
+        # each sleeve pays its fee on its value at the start of the bar
+        start = np.ones_like(net)
+        start[:, 1:] = res['Cumulative Return (net)'][:, :-1]
+        fees = w @ (start * res['Cost Pct'])
+
+    index = panel['Adj Close'].index
+    return PortfolioResult(
+        equity=pd.DataFrame({'Cumulative Return': equity,
+                             'Cumulative Return (net)': equity_net,
+                             'Fees': fees}, index=index),
+        sleeves=pd.DataFrame(res['Cumulative Return (net)'].T, index=index, columns=symbols),
+        positions=pd.DataFrame(res['Position'].T, index=index, columns=symbols),
+        weights=pd.Series(w, index=symbols, name='Weight'),
+    )
+
+
+def _per_symbol(value, symbols: list) -> np.ndarray:
+    # one value for every symbol, from a scalar or a {symbol: value} dict
+    if isinstance(value, dict):
+        missing = set(symbols) - set(value)
+        if missing:
+            raise KeyError(f"No HiLo period for {sorted(missing)}")
+        return np.array([value[s] for s in symbols], dtype=np.int64)
+    return np.full(len(symbols), int(value), dtype=np.int64)
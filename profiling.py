@@ -0,0 +1,167 @@
+# profiling.py
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# the Profiler collecting stage records, if any (see Profiler.__enter__)
+_active = None
+
+
+class Profiler:
+    """
+    Collects one record per pipeline stage: wall and CPU seconds, rows
+    processed, bytes downloaded and, with memory=True, the peak traced
+    allocation above the stage's starting point (tracemalloc, which slows
+    the run down). With cprofile=True a cProfile of the whole session is
+    captured as well.
+
+        with Profiler() as prof:
+            main()
+        prof.save('run.json')
+
+    Code under the 'with' block reports stages through profiling.stage()
+    and profiling.count(); without an active Profiler those cost nothing.
+    """
+
+    def __init__(self, memory: bool = False, cprofile: bool = False):
+        self.memory = memory
+        self.records = []
+        self.profile = cProfile.Profile() if cprofile else None
+        self._stack = []
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def __enter__(self) -> 'Profiler':
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.profile is not None:
+            self.profile.enable()
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        if self.profile is not None:
+            self.profile.disable()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows: int = None):
+        record = {'stage': name, 'rows': rows, 'bytes': 0}
+        with self._lock:
+            parent = self._stack[-1] if self._stack else None
+            record['parent'] = parent['stage'] if parent else None
+            self._stack.append(record)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent['_peak'] = max(parent['_peak'], peak)
+            record['_start'] = current
+            record['_peak'] = current
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], record.pop('_peak'))
+                record['peak_mb'] = (peak - record.pop('_start')) / 1e6
+                if parent is not None:
+                    parent['_peak'] = max(parent['_peak'], peak)
+            if resource is not None:
+                # process high-water mark (kB on Linux)
+                record['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+            with self._lock:
+                self._stack.remove(record)
+                self.records.append(record)
+            log.info("%s: %.3fs wall, %.3fs cpu%s", name, record['wall_s'], record['cpu_s'],
+                     f", {record['rows']:,} rows" if record['rows'] is not None else '')
+
+    def count(self, rows: int = 0, bytes: int = 0):
+        # add to the innermost open stage
+        with self._lock:
+            if not self._stack:
+                return
+            record = self._stack[-1]
+            if rows:
+                record['rows'] = (record['rows'] or 0) + rows
+            record['bytes'] += bytes
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        The stage records as a table, in the order the stages finished.
+        """
+        return pd.DataFrame(self.records)
+
+    def save(self, path: Path, top: int = 30) -> Path:
+        """
+        Write the stage records to 'path' as JSON. With cProfile enabled the
+        raw profile is saved next to it as <name>.prof (open with pstats or
+        snakeviz) and the 'top' functions by cumulative time go into the JSON.
+        """
+        path = Path(path)
+        data = {'stages': self.records}
+        if self.profile is not None:
+            prof_file = path.with_suffix('.prof')
+            self.profile.dump_stats(prof_file)
+            text = io.StringIO()
+            pstats.Stats(self.profile, stream=text).sort_stats('cumulative').print_stats(top)
+            data['cprofile'] = {'file': str(prof_file), 'top': text.getvalue()}
+        path.write_text(json.dumps(data, indent=2))
+        log.info("Profile saved to %s", path)
+        return path
+
+
+@contextlib.contextmanager
+def stage(name: str, rows: int = None):
+    """
+    Time the enclosed block as stage 'name' of the active Profiler; a no-op
+    when none is active.
+    """
+    if _active is None:
+        yield None
+        return
+    with _active.stage(name, rows) as record:
+        yield record
+
+
+def count(rows: int = 0, bytes: int = 0):
+    """
+    Add processed rows / downloaded bytes to the active Profiler's current stage.
+    """
+    if _active is not None:
+        _active.count(rows, bytes)
+
+
+def setup_logging(verbosity: int = 0):
+    """
+    Logging for the command line scripts: warnings only by default,
+    progress messages with verbosity 1, and everything (e.g. whole
+    frames) with 2.
+    """
+    level = {0: logging.WARNING, 1: logging.INFO}.get(verbosity, logging.DEBUG)
+    logging.basicConfig(level=level, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
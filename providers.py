@@ -0,0 +1,244 @@
+# providers.py
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+log = logging.getLogger(__name__)
+
+# Yahoo's intraday limits: {interval: (max days per request, days of history kept)}
+INTRADAY = {
+    '1m': (7, 30),
+    '2m': (60, 60),
+    '5m': (60, 60),
+    '15m': (60, 60),
+    '30m': (60, 60),
+    '90m': (60, 60),
+    '60m': (730, 730),
+    '1h': (730, 730),
+}
+# concurrent requests when a range is split into chunks
+CHUNK_WORKERS = 4
+
+
+class DataProvider:
+    """
+    A source of OHLCV bars.
+
+    fetch() returns the bars of 'symbol' in [start, end) (None: from the
+    first / up to the last bar available) as a DataFrame with a tz-naive
+    DatetimeIndex named 'Date' and one column per field ('Adj Close',
+    'High', 'Low', ...). Remote providers are put behind the local cache
+    by data.fetch_data; local ones are read directly.
+    """
+
+    remote = True
+
+    def fetch(self, symbol: str, start: pd.Timestamp = None, end: pd.Timestamp = None,
+              interval: str = '1d', columns: list = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def earliest(self, interval: str) -> pd.Timestamp:
+        """
+        First day this provider can still serve bars of 'interval' for.
+        """
+        return pd.Timestamp('1900-01-01')
+
+
+class YahooProvider(DataProvider):
+    """
+    Yahoo Finance through yfinance. Intraday ranges are split into the
+    request spans Yahoo allows (INTRADAY) and fetched concurrently.
+    """
+
+    def fetch(self, symbol: str, start: pd.Timestamp = None, end: pd.Timestamp = None,
+              interval: str = '1d', columns: list = None) -> pd.DataFrame:
+        if interval not in INTRADAY:
+            if start is None and end is None:
+                df = _download(symbol, period="max", interval=interval)
+            else:
+                df = _download(symbol, start=start, end=end, interval=interval)
+        else:
+            df = self._fetch_chunks(symbol, start if start is not None else self.earliest(interval),
+                                    end if end is not None else _today() + pd.Timedelta(days=1),
+                                    interval)
+        return df if columns is None else df[columns]
+
+    def earliest(self, interval: str) -> pd.Timestamp:
+        if interval not in INTRADAY:
+            return super().earliest(interval)
+        return _today() - pd.Timedelta(days=INTRADAY[interval][1] - 1)
+
+    def _fetch_chunks(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp,
+                      interval: str) -> pd.DataFrame:
+        earliest = self.earliest(interval)
+        if start < earliest:
+            log.warning("Yahoo keeps %s bars for %d days only; %s starts at %s.",
+                        interval, INTRADAY[interval][1], symbol, earliest.date())
+            start = earliest
+        step = pd.Timedelta(days=INTRADAY[interval][0])
+        bounds = []
+        while start < end:
+            bounds.append((start, min(start + step, end)))
+            start += step
+        if not bounds:
+            return _normalize(pd.DataFrame())
+        with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(bounds))) as pool:
+            parts = list(pool.map(lambda b: _download_chunk(symbol, b[0], b[1], interval), bounds))
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            return _normalize(pd.DataFrame())
+        # chunks arrive in order; one concat copies every bar exactly once
+        df = pd.concat(parts) if len(parts) > 1 else parts[0]
+        return df[~df.index.duplicated(keep='last')]
+
+
+class LocalFileProvider(DataProvider):
+    """
+    OHLCV dumps in a local folder, one per symbol (and bar size):
+
+        <root>/<symbol>/             column .npy files + meta.json, the Cache layout
+        <root>/<symbol>.parquet      e.g. written with df.to_parquet()
+        <root>/<symbol>.csv          a 'Date' column plus one column per field
+
+    Non-daily bars use '<symbol>_<interval>' as the name. NumPy folders are
+    memory-mapped and Parquet files are read with column projection and
+    date filters, so only the requested rows and columns are loaded. CSV
+    has to be parsed in full and is only sliced afterwards.
+    """
+
+    remote = False
+
+    def __init__(self, root, formats: tuple = ('npy', 'parquet', 'csv')):
+        self.root = Path(root)
+        self.formats = formats
+
+    def fetch(self, symbol: str, start: pd.Timestamp = None, end: pd.Timestamp = None,
+              interval: str = '1d', columns: list = None) -> pd.DataFrame:
+        name = bar_name(symbol, interval)
+        for fmt in self.formats:
+            if fmt == 'npy' and (self.root / name / 'meta.json').exists():
+                return read_folder(self.root / name, start, end, columns)[0]
+            if fmt == 'parquet' and (self.root / f"{name}.parquet").exists():
+                return self._read_parquet(self.root / f"{name}.parquet", start, end, columns)
+            if fmt == 'csv' and (self.root / f"{name}.csv").exists():
+                return self._read_csv(self.root / f"{name}.csv", start, end, columns)
+        log.warning("No %s bars for %s in %s.", interval, symbol, self.root)
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+
+    def _read_parquet(self, path: Path, start, end, columns) -> pd.DataFrame:
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('Date', '<', pd.Timestamp(end)))
+        try:
+            df = pd.read_parquet(path, columns=columns, filters=filters or None)
+        except ImportError as exc:
+            raise ImportError("Parquet dumps need pyarrow: pip install pyarrow") from exc
+        if 'Date' in df.columns:
+            df = df.set_index('Date')
+        return _normalize(df.sort_index())
+
+    def _read_csv(self, path: Path, start, end, columns) -> pd.DataFrame:
+        usecols = None if columns is None else ['Date', *columns]
+        df = pd.read_csv(path, usecols=usecols, index_col='Date', parse_dates=['Date'])
+        df = _normalize(df.sort_index())
+        i0 = 0 if start is None else df.index.searchsorted(pd.Timestamp(start))
+        i1 = len(df) if end is None else df.index.searchsorted(pd.Timestamp(end))
+        return df.iloc[i0:i1]
+
+
+# used by fetch_data when no provider is given
+YAHOO = YahooProvider()
+
+
+def get_provider(name: str = 'yahoo', data_dir=None) -> DataProvider:
+    """
+    Provider by name: 'yahoo', or 'local' for the dumps in 'data_dir'.
+    """
+    if name == 'yahoo':
+        return YAHOO
+    if name == 'local':
+        if data_dir is None:
+            raise ValueError("The local provider needs a data_dir.")
+        return LocalFileProvider(data_dir)
+    raise ValueError(f"Unknown data provider: {name}")
+
+
+def bar_name(symbol: str, interval: str = '1d') -> str:
+    """
+    File / folder name of a symbol's bars: daily bars use the plain symbol,
+    other bar sizes get '_<interval>' appended.
+    """
+    name = symbol if interval == '1d' else f"{symbol}_{interval}"
+    return re.sub(r'[^A-Za-z0-9._=^-]', '_', name)
+
+
+def read_folder(folder: Path, start: pd.Timestamp = None, end: pd.Timestamp = None,
+                columns: list = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Load the bars in [start, end) from a folder of memory-mapped column
+    files, and its metadata. Only the requested rows (and 'columns',
+    default all) are read from disk.
+    """
+    meta_file = Path(folder) / 'meta.json'
+    if not meta_file.exists():
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date')), {}
+    meta = json.loads(meta_file.read_text())
+    index = np.load(folder / 'index.npy', mmap_mode='r')
+    i0 = 0 if start is None else np.searchsorted(index, np.datetime64(start, 'ns'))
+    i1 = len(index) if end is None else np.searchsorted(index, np.datetime64(end, 'ns'))
+    names = meta['columns'] if columns is None else columns
+    data = {
+        name: np.array(np.load(folder / meta['columns'][name], mmap_mode='r')[i0:i1])
+        for name in names
+    }
+    df = pd.DataFrame(data, index=pd.DatetimeIndex(np.array(index[i0:i1]), name='Date'))
+    return df, meta
+
+
+def _download(symbol: str, **kwargs) -> pd.DataFrame:
+    # yfinance is slow to import; runs on cached or local data never need it
+    import yfinance as yf
+    df = yf.download(
+        tickers=symbol,
+        auto_adjust=False,
+        group_by='column',
+        progress=False,
+        **kwargs
+    )
+    return _normalize(df)
+
+
+def _download_chunk(symbol: str, start: pd.Timestamp, end: pd.Timestamp, interval: str) -> pd.DataFrame:
+    # yf.download keeps its results in module-wide dicts keyed by ticker, so
+    # concurrent calls for the same ticker clash; Ticker.history does not
+    import yfinance as yf
+    df = yf.Ticker(symbol).history(start=start, end=end, interval=interval,
+                                   auto_adjust=False, actions=False)
+    return _normalize(df[sorted(df.columns)])
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # yfinance does not report transfer sizes; count the bars' in-memory size
+    profiling.count(bytes=int(df.memory_usage(index=True).sum()))
+    # flatten the (Price, Ticker) columns and drop timezone so cached and
+    # freshly downloaded frames look the same
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+    df.columns.name = None
+    if getattr(df.index, 'tz', None) is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = 'Date'
+    return df
+
+
+def _today() -> pd.Timestamp:
+    return pd.Timestamp.now().normalize()
@@ -1,20 +1,32 @@
 # report.py
-from matplotlib.pylab import f
-import matplotlib.pyplot as plt
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
 from matplotlib.ticker import ScalarFormatter, StrMethodFormatter
 from openpyxl.utils import get_column_letter
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.drawing.image import Image as ExcelImage
 from openpyxl.formatting.rule import FormulaRule
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.styles import Font
-import yfinance as yf
 from pathlib import Path
 import pandas as pd
+from benchmark_data import BENCHMARKS, PROVIDER, BenchmarkProvider
+from metrics import count_trades
 
+log = logging.getLogger(__name__)
 
-def plot_results(opt_df: pd.DataFrame, symbol: str, out_file: Path = None) -> Path:
-    fig, ax = plt.subplots(figsize=(12, 7))
+# Excel sheets stop at 1,048,576 rows (one is the header)
+EXCEL_MAX_ROWS = 1_048_575
+# charts embedded in the report, in sheet order
+CHARTS = ['opt', 'cmp', 'signals']
+
+
+def plot_results(opt_df: pd.DataFrame, symbol: str, out_file: Path = None):
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots()
     # compute percentages
     gross_pct = (opt_df['Cumulative Return %'] - 1) * 100
     net_pct = (opt_df['Cumulative Return (net) %'] - 1) * 100
@@ -28,19 +40,13 @@ def plot_results(opt_df: pd.DataFrame, symbol: str, out_file: Path = None) -> Pa
     ax.set_ylabel('Cumulative Return (%)')
     ax.set_title(f'{symbol} HiLo Optimization')
     ax.legend()
-    plt.tight_layout()
+    fig.tight_layout()
 
     ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
     # expand left margin so labels are not cut off
     fig.subplots_adjust(left=0.15)
 
-    if out_file:
-        fig.savefig(out_file)
-        plt.close(fig)
-        return out_file
-    plt.show()
-    plt.close(fig)
-    return None
+    return _finish(fig, out_file)
 
 
 def plot_comparison(
@@ -48,10 +54,12 @@ def plot_comparison(
     best_period: int,
     symbol: str,
     initial_capital: float = 10000,
-    out_file: Path = None
-) -> Path:
+    out_file: Path = None,
+    benchmarks: dict = None,
+    provider: BenchmarkProvider = PROVIDER
+):
     """
-    Plot strategy vs buy & hold vs S&P 500, showing growth of initial capital.
+    Plot strategy vs buy & hold vs benchmarks, showing growth of initial capital.
 
     Args:
         df: Backtest DataFrame, must contain 'Cumulative Return' and 'Cumulative Return (net)'.
@@ -59,11 +67,14 @@ def plot_comparison(
         symbol: Ticker symbol string.
         initial_capital: Starting capital in dollars.
         out_file: Optional Path to save the figure.
+        benchmarks: {label: ticker} to compare against (default: S&P 500).
+        provider: Where benchmark prices come from; loaded once per process.
 
     Returns:
-        The Path of the saved figure if out_file provided, else None.
+        The Path of the saved figure if out_file provided, else the PNG bytes.
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots()
 
     # compute growth of initial capital
     gross_val = df['Cumulative Return'] * initial_capital
@@ -78,20 +89,15 @@ def plot_comparison(
     ax.plot(df.index, buy_val,
             label='Buy & Hold', linestyle='-')
 
-    # fetch and plot S&P 500 growth
-    sp = yf.download(
-        tickers='^GSPC',
-        start=df.index[0].strftime('%Y-%m-%d'),
-        end=df.index[-1].strftime('%Y-%m-%d'),
-        auto_adjust=False,
-        group_by='column',
-        progress=False
-    )
-    if isinstance(sp.columns, pd.MultiIndex):
-        sp.columns = sp.columns.get_level_values(0)
-    sp_adj = sp['Adj Close'].tz_localize(None).reindex(df.index).ffill()
-    sp_val = (sp_adj / sp_adj.iloc[0]) * initial_capital
-    ax.plot(df.index, sp_val, label='S&P 500', linestyle='-')
+    # benchmark growth, served from memory / the local cache
+    for label, ticker in (BENCHMARKS if benchmarks is None else benchmarks).items():
+        bench = provider.aligned(ticker, df.index)
+        first = bench.first_valid_index()
+        if first is None:
+            log.warning("No %s (%s) prices; left out of the chart.", label, ticker)
+            continue
+        bench_val = (bench / bench.loc[first]) * initial_capital
+        ax.plot(df.index, bench_val, label=label, linestyle='-')
 
     # finalize plot
     ax.set_xlabel('Date')
@@ -100,19 +106,13 @@ def plot_comparison(
         f'{symbol} Strategy vs Benchmark (Growth of ${initial_capital:,.0f})')
     ax.legend()
     ax.grid(True)
-    plt.tight_layout()
+    fig.tight_layout()
 
     ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
     # expand left margin so labels are not cut off
     fig.subplots_adjust(left=0.15)
 
-    if out_file:
-        fig.savefig(out_file)
-        plt.close(fig)
-        return out_file
-    plt.show()
-    plt.close(fig)
-    return None
+    return _finish(fig, out_file)
 
 
 def plot_signals_with_returns(
@@ -120,12 +120,13 @@ def plot_signals_with_returns(
     best_period: int,
     symbol: str,
     out_file: Path = None
-) -> Path:
+):
     """
     Plot gross and net cumulative returns with buy arrows below the NET return line
     and sell arrows above the GROSS return line.
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots()
 
     # compute cumulative returns
     gross_pct = df['Cumulative Return'] * 100
@@ -162,103 +163,218 @@ def plot_signals_with_returns(
     ax.set_title(f'{symbol} Returns & Signals (HiLo={best_period})')
     ax.legend()
     ax.grid(True)
-    plt.tight_layout()
+    fig.tight_layout()
 
     ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
     # expand left margin so labels are not cut off
     fig.subplots_adjust(left=0.15)
 
+    return _finish(fig, out_file)
+
+
+def render_charts(opt_df: pd.DataFrame, df: pd.DataFrame, best_period: int, symbol: str,
+                  benchmarks: dict = None, workers: int = 1) -> list[bytes]:
+    """
+    PNG bytes of the optimization, comparison and signals charts (CHARTS
+    order), ready for save_to_excel. With workers > 1 the three charts are
+    drawn in parallel processes.
+    """
+    return render_many([(opt_df, df, best_period, symbol, benchmarks)], workers)[0]
+
+
+def render_many(items: list[tuple], workers: int = 1) -> list[list[bytes]]:
+    """
+    render_charts() for many symbols at once. 'items' holds
+    (opt_df, df, best_period, symbol, benchmarks) tuples; the charts of all
+    of them are spread over one pool of 'workers' processes.
+    """
+    jobs = []
+    for opt_df, df, best_period, symbol, benchmarks in items:
+        jobs += [
+            (plot_results, (opt_df, symbol), {}),
+            (plot_comparison, (df, best_period, symbol), {'benchmarks': benchmarks}),
+            (plot_signals_with_returns, (df, best_period, symbol), {}),
+        ]
+    if workers > 1 and len(jobs) > 1:
+        # load the benchmarks here once; the workers only read them
+        for _, df, _, _, benchmarks in items:
+            for ticker in (BENCHMARKS if benchmarks is None else benchmarks).values():
+                PROVIDER.aligned(ticker, df.index)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer) as pool:
+            pngs = list(pool.map(_render, *zip(*jobs)))
+    else:
+        pngs = [_render(*job) for job in jobs]
+    return [pngs[i:i + len(CHARTS)] for i in range(0, len(pngs), len(CHARTS))]
+
+
+def _init_renderer():
+    PROVIDER.offline = True
+
+
+def _render(plot, args: tuple, kwargs: dict) -> bytes:
+    return plot(*args, **kwargs)
+
+
+def _finish(fig: Figure, out_file: Path = None):
+    # Agg canvas, no pyplot: nothing is shown and no global figure is kept
     if out_file:
         fig.savefig(out_file)
-        plt.close(fig)
         return out_file
-    plt.show()
-    plt.close(fig)
-    return None
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
 
 
-def save_to_excel(df: pd.DataFrame, opt_df: pd.DataFrame, imgs: list, out_path: str):
-    # 1) write the Data & Optimization sheets
-    with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Data', index=True)
-        opt_df.to_excel(writer, sheet_name='Optimization', index=False)
+def save_to_excel(df: pd.DataFrame, opt_df: pd.DataFrame, imgs: list, out_path: str,
+                  data_format: str = 'xlsx'):
+    """
+    Write the Excel report (Data, Optimization and Plots sheets) in one pass.
+
+    Uses openpyxl's write-only mode, so rows are streamed straight to disk
+    and the workbook is never reloaded. With data_format='csv' or 'parquet'
+    the bulky per-bar data is written next to the workbook in that format
+    and the Data sheet only keeps the summary cells.
+    """
+    out_path = Path(out_path)
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
 
-    # 2) reopen with openpyxl
-    wb = load_workbook(out_path)
+    # 1) summary figures
+    total_cost = df['Cost'].sum()
+    # entries into a long or short position, as counted by the optimizer
+    num_trades = int(count_trades(df['Position'].to_numpy()))
 
-    # 3) freeze the first row on every sheet
-    for ws in wb.worksheets:
-        ws.freeze_panes = 'A2'
+    # Number of net returns > 1x
+    nr_pos_return = int((opt_df['Cumulative Return (net) %'] > 1).sum())
+    log.info("Number of net returns > 1x: %d", nr_pos_return)
+    # Number of net returns < 1x
+    nr_neg_return = int((opt_df['Cumulative Return (net) %'] < 1).sum())
+    log.info("Number of net returns < 1x: %d", nr_neg_return)
+
+    # 2) Data sheet, with Total Cost and Trades two columns right of the data
+    data_ws = wb.create_sheet('Data')
+    if data_format == 'xlsx':
+        frame = df.reset_index(names=df.index.name or '')
+        _write_frame(data_ws, frame, extra={
+            len(frame.columns) + 1: ('Total Cost', total_cost),
+            len(frame.columns) + 2: ('Trades', num_trades),
+        })
+    else:
+        data_file = out_path.with_name(f"{out_path.stem}_data.{data_format}")
+        if data_format == 'parquet':
+            try:
+                df.to_parquet(data_file)
+            except ImportError as exc:
+                raise ImportError("Parquet data files need pyarrow: pip install pyarrow") from exc
+        elif data_format == 'csv':
+            df.to_csv(data_file)
+        else:
+            raise ValueError(f"Unknown data format: {data_format}")
+        log.info("Saved data to %s", data_file)
+        data_ws.freeze_panes = 'A2'
+        _set_widths(data_ws, [len('Data File'), len(str(data_file.name)),
+                              len('Total Cost'), len('Trades')])
+        data_ws.append([_header(data_ws, 'Data File', bold), None,
+                        _header(data_ws, 'Total Cost', bold), _header(data_ws, 'Trades', bold)])
+        data_ws.append([data_file.name, None, total_cost, num_trades])
+
+    # 3) Optimization sheet with color scale on 'Cumulative Return' in col C
+    opt_ws = wb.create_sheet('Optimization')
+    rule = ColorScaleRule(
+        start_type='min', start_color='FFFF0000',
+        mid_type='num', mid_value=1, mid_color='FFFFFFFF',
+        end_type='max', end_color='FF00FF00'
+    )
+    opt_ws.conditional_formatting.add(f'C2:C{len(opt_df) + 1}', rule)
+    _write_frame(opt_ws, opt_df, extra={
+        len(opt_df.columns): ('% Positive', nr_pos_return),
+        len(opt_df.columns) + 1: ('% Negative', nr_neg_return),
+    }, bold_extra=False)
 
-    # 4) insert Plots sheet and pictures without overlap
+    # 4) Plots sheet, pictures stacked without overlap
     plots_ws = wb.create_sheet('Plots')
     col = 'A'
     row = 1
-    for img_path in imgs:
-        img = ExcelImage(str(img_path))
+    for img_src in imgs:
+        if isinstance(img_src, bytes):
+            img_src = io.BytesIO(img_src)
+        img = ExcelImage(str(img_src) if isinstance(img_src, Path) else img_src)
         plots_ws.add_image(img, f"{col}{row}")
         # calculate rows needed (approx. img.height / 14.5px per row)
         rows_to_skip = int(img.height / 14.5) - 7
         row += rows_to_skip
 
-    # 5) add color scale to Optimization sheet
-    opt_ws = wb['Optimization']
-    last_row = opt_ws.max_row
-    rule = ColorScaleRule(
-        start_type='min', start_color='FFFF0000',
-        mid_type='num', mid_value=1, mid_color='FFFFFFFF',
-        end_type='max', end_color='FF00FF00'
-    )
-    # apply to 'Cumulative Return' in col C
-    opt_ws.conditional_formatting.add(f'C2:C{last_row}', rule)
+    # 5) save to a temporary file first, so an interrupted save never
+    # leaves a broken report (or replaces a good one with it)
+    log.info("Saving report to %s", out_path)
+    partial = out_path.with_name(f"{out_path.name}.partial")
+    wb.save(partial)
+    partial.replace(out_path)
+    log.info("Report saved successfully.")
 
-    # Number of net returns > 1x
-    nr_pos_return = (opt_df['Cumulative Return (net) %'] > 1).sum()
-    print(f"Number of net returns > 1x: {nr_pos_return}"
-          )
-    # Number of net returns < 1x
-    nr_neg_return = (opt_df['Cumulative Return (net) %'] < 1).sum()
-    print(f"Number of net returns < 1x: {nr_neg_return}")
-
-    last_col = opt_ws.max_column
-    col_pct_pos = get_column_letter(last_col + 1)
-    col_pct_neg = get_column_letter(last_col + 2)
-    opt_ws[f'{col_pct_pos}1'] = '% Positive'
-    opt_ws[f'{col_pct_neg}1'] = '% Negative'
-    opt_ws[f'{col_pct_pos}2'] = nr_pos_return
-    opt_ws[f'{col_pct_neg}2'] = nr_neg_return
-
-    # 6) add Total Cost and Trades to Data sheet
-    data_ws = wb['Data']
-    last_col = data_ws.max_column
-    col_cost = get_column_letter(last_col + 2)
-    col_trades = get_column_letter(last_col + 3)
-    total_cost = df['Cost'].sum()
 
-    # instead of diff().abs().sum(), do:
-    buy_signals = ((df['Position'] == 1) & (
-        df['Position'].shift(1) != 1)).sum()
-    sell_signals = ((df['Position'] == -1) &
-                    (df['Position'].shift(1) != -1)).sum()
-    num_trades = int(buy_signals + sell_signals)
-
-    data_ws[f'{col_cost}1'] = 'Total Cost'
-    data_ws[f'{col_cost}2'] = total_cost
-    data_ws[f'{col_trades}1'] = 'Trades'
-    data_ws[f'{col_trades}2'] = num_trades
+def _write_frame(ws, frame: pd.DataFrame, extra: dict, bold_extra: bool = True):
+    """
+    Stream a DataFrame into a write-only sheet: bold header, frozen first
+    row, widths from a sample of each column, and optional summary cells
+    {column position: (header, value)} placed in the first two rows.
+    """
     bold = Font(bold=True)
-    data_ws[f'{col_cost}1'].font = bold
-    data_ws[f'{col_trades}1'].font = bold
-
-    # 7) autofit all columns on every sheet
-    for ws in wb.worksheets:
-        for col_cells in ws.columns:
-            col_letter = get_column_letter(col_cells[0].column)
-            max_length = max((len(str(cell.value))
-                             for cell in col_cells if cell.value is not None), default=0)
-            ws.column_dimensions[col_letter].width = max_length + 2
-
-    # 8) save
-    print(f"Saving report to {out_path}")
-    wb.save(out_path)
-    print("Report saved successfully.")
+    ncols = len(frame.columns) + (max(extra) + 1 - len(frame.columns) if extra else 0)
+    widths = [0] * ncols
+    for i, name in enumerate(frame.columns):
+        widths[i] = max(len(str(name)), _sample_width(frame[name]))
+    for pos, (name, value) in extra.items():
+        widths[pos] = max(len(name), len(str(value)))
+
+    # sheet properties must be set before the first row is written
+    ws.freeze_panes = 'A2'
+    _set_widths(ws, widths)
+
+    header = [None] * ncols
+    for i, name in enumerate(frame.columns):
+        header[i] = _header(ws, str(name), bold)
+    for pos, (name, _) in extra.items():
+        header[pos] = _header(ws, name, bold) if bold_extra else name
+    ws.append(header)
+
+    # convert column by column; NaN becomes an empty cell
+    columns = []
+    for name in frame.columns:
+        col = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(col):
+            values = [None if pd.isna(v) else v for v in col.tolist()]
+        else:
+            values = col.astype(object).where(col.notna(), None).tolist()
+        columns.append(values)
+    pad = [None] * (ncols - len(frame.columns))
+    for i, values in enumerate(zip(*columns)):
+        if i == 0 and extra:
+            first = pad.copy()
+            for pos, (_, value) in extra.items():
+                first[pos - len(frame.columns)] = value
+            ws.append(list(values) + first)
+        else:
+            ws.append(values)
+
+
+def _header(ws, value: str, font: Font) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = font
+    return cell
+
+
+def _sample_width(col: pd.Series, size: int = 1000) -> int:
+    # widest str() of a sample of the column, including its extremes
+    if col.empty:
+        return 0
+    step = max(1, len(col) // size)
+    sample = col.iloc[::step].dropna().tolist()
+    if pd.api.types.is_numeric_dtype(col) and col.notna().any():
+        sample += [col.min(), col.max()]
+    return max((len(str(v)) for v in sample), default=0)
+
+
+def _set_widths(ws, widths: list):
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width + 2
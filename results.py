@@ -0,0 +1,127 @@
+# results.py
+import contextlib
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data import CACHE_DIR
+from indicators import fingerprint
+
+# sweep results of every run, next to the price cache
+RESULTS_DB = CACHE_DIR / 'results.sqlite'
+
+
+class ResultStore:
+    """
+    Sweep results kept on disk in a SQLite database, one row per
+    (symbol, data fingerprint, strategy variant, transaction cost, period).
+
+    optimize_hilo saves every block of periods as soon as it is computed
+    and only sweeps the periods the store does not have yet, so an
+    interrupted sweep resumes where it stopped and a repeated run comes
+    straight from the store. The data fingerprint changes with any price
+    or date, so new bars never reuse stale results.
+
+    Only the database path is kept; every call opens its own connection,
+    so one store can be shared by threads and worker processes.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = Path(path)
+
+    def load(self, symbol: str, data: str, variant: str, transaction_cost: float,
+             columns: list) -> dict:
+        """
+        {period: {column: value}} of the stored periods that have all
+        'columns'.
+        """
+        if not self.path.exists():
+            return {}
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT period, result FROM sweeps "
+                "WHERE symbol = ? AND data = ? AND variant = ? AND cost = ?",
+                (symbol or '', data, variant, float(transaction_cost))
+            ).fetchall()
+        found = {}
+        for period, result in rows:
+            values = json.loads(result)
+            if all(c in values for c in columns):
+                found[period] = {c: values[c] for c in columns}
+        return found
+
+    def save(self, symbol: str, data: str, variant: str, transaction_cost: float,
+             table: pd.DataFrame):
+        """
+        Store one row per 'HiLo' period of 'table'. Columns a period
+        already has in the store but not in 'table' (e.g. metrics from an
+        earlier run) are kept.
+        """
+        key = (symbol or '', data, variant, float(transaction_cost))
+        values = table.drop(columns=['HiLo']).to_dict('records')
+        with self._connect() as con:
+            old = dict(con.execute(
+                "SELECT period, result FROM sweeps "
+                "WHERE symbol = ? AND data = ? AND variant = ? AND cost = ?", key
+            ).fetchall())
+            rows = []
+            for p, row in zip(table['HiLo'], values):
+                merged = json.loads(old[int(p)]) if int(p) in old else {}
+                merged.update({k: _plain(v) for k, v in row.items()})
+                rows.append(key + (int(p), json.dumps(merged)))
+            con.executemany("INSERT OR REPLACE INTO sweeps VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def clear(self, symbol: str = None):
+        """
+        Drop the stored results of 'symbol', or of everything.
+        """
+        if not self.path.exists():
+            return
+        with self._connect() as con:
+            if symbol is None:
+                con.execute("DELETE FROM sweeps")
+            else:
+                con.execute("DELETE FROM sweeps WHERE symbol = ?", (symbol,))
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # one transaction per call, committed on success
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # several batch workers may write at once; wait for the lock
+        con = sqlite3.connect(self.path, timeout=60)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS sweeps ("
+                "symbol TEXT, data TEXT, variant TEXT, cost REAL, period INTEGER, result TEXT, "
+                "PRIMARY KEY (symbol, data, variant, cost, period))"
+            )
+            with con:
+                yield con
+        finally:
+            con.close()
+
+
+# shared by main.py and batch.py
+RESULTS = ResultStore()
+
+
+def data_key(df: pd.DataFrame, columns: tuple = ('Adj Close', 'High', 'Low')) -> str:
+    """
+    Fingerprint of everything a sweep reads from 'df': the dates and the
+    'columns' (the prices HiLo uses, plus any an execution model reads).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(fingerprint(df.index.to_numpy()).encode())
+    for column in columns:
+        h.update(fingerprint(df[column].to_numpy(dtype=np.float64)).encode())
+    return h.hexdigest()
+
+
+def _plain(value):
+    # numpy scalars to JSON-friendly Python values
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,172 @@
+# robustness.py
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from strategy import hilo_matrix
+
+METHODS = ('block', 'stationary', 'gbm')
+
+
+def bootstrap_hilo(
+    df: pd.DataFrame,
+    periods: range,
+    transaction_cost: float,
+    n_paths: int = 1000,
+    method: str = 'block',
+    block: int = 20,
+    mode: str = 'long-short',
+    select: str = 'Cumulative Return %',
+    seed: int = None,
+    workers: int = 1,
+    progress=None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Monte Carlo robustness test of the HiLo period sweep.
+
+    Builds 'n_paths' synthetic price paths from the history in 'df' and
+    sweeps every period on each of them, picking the best by 'select' just
+    like get_best does on the real data. Returns one row per path (its best
+    period and that period's gross/net return, plus the returns of the
+    period chosen on the real data) and the distribution of best periods.
+
+    method='block' resamples blocks of 'block' consecutive bars (moving block
+    bootstrap), 'stationary' uses random block lengths averaging 'block'
+    bars, and 'gbm' draws normally distributed returns with the history's
+    mean and volatility. Each bar's High and Low keep their distance to the
+    close of the bar they were drawn with.
+
+    Paths are generated inside the workers from per-path seeds, so the
+    result for a given 'seed' does not depend on 'workers'. progress(done,
+    total) is called as batches of paths finish.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+    if select not in ('Cumulative Return %', 'Cumulative Return (net) %'):
+        raise KeyError(f"Unknown selection column: {select}")
+    periods = np.asarray(list(periods), dtype=np.int64)
+    features = _features(df)
+    if len(features[0]) < 2:
+        raise ValueError('Need at least three bars with prices to resample.')
+
+    # the period the real history picks, to see how it fares on every path
+    res = hilo_matrix(df, periods, transaction_cost, modes=[mode])
+    score = res['Cumulative Return' if select == 'Cumulative Return %'
+                else 'Cumulative Return (net)'][0, :, -1]
+    chosen = int(np.argmax(np.where(np.isnan(score), -np.inf, score)))
+
+    seeds = np.random.SeedSequence(seed).spawn(n_paths)
+    # a few batches per worker keeps them busy without pickling per path
+    size = max(1, -(-n_paths // (max(workers, 1) * 4)))
+    batches = [seeds[i:i + size] for i in range(0, n_paths, size)]
+    args = [(features, periods, transaction_cost, method, block, mode, select, chosen, b)
+            for b in batches]
+    parts = []
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_sweep_paths, *zip(*args)):
+                parts.append(part)
+                if progress is not None:
+                    progress(sum(len(p) for p in parts), n_paths)
+    else:
+        for a in args:
+            parts.append(_sweep_paths(*a))
+            if progress is not None:
+                progress(sum(len(p) for p in parts), n_paths)
+    values = np.vstack(parts)
+
+    paths = pd.DataFrame({
+        'Path': np.arange(n_paths),
+        'Best HiLo': periods[values[:, 0].astype(np.int64)],
+        'Cumulative Return %': values[:, 1],
+        'Cumulative Return (net) %': values[:, 2],
+        'Chosen HiLo': periods[chosen],
+        'Chosen Return %': values[:, 3],
+        'Chosen Return (net) %': values[:, 4],
+    })
+    counts = paths['Best HiLo'].value_counts()
+    dist = pd.DataFrame({
+        'HiLo': counts.index.astype(np.int64),
+        'Paths': counts.to_numpy(),
+        'Share %': counts.to_numpy() / n_paths * 100,
+    }).sort_values('HiLo').reset_index(drop=True)
+    return paths, dist
+
+
+def bootstrap_paths(df: pd.DataFrame, n_paths: int, method: str = 'block',
+                    block: int = 20, seed: int = None) -> pd.DataFrame:
+    """
+    The synthetic paths bootstrap_hilo sweeps, as one frame per path stacked
+    with a ('Path', bar) index and 'Adj Close', 'High', 'Low' columns.
+    Meant for inspecting or plotting a handful of paths.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+    features = _features(df)
+    frames = []
+    for i, s in enumerate(np.random.SeedSequence(seed).spawn(n_paths)):
+        close, high, low = _synthetic(features, method, block, np.random.default_rng(s))
+        frames.append(pd.DataFrame({'Adj Close': close, 'High': high, 'Low': low}))
+    return pd.concat(frames, keys=range(n_paths), names=['Path', 'Bar'])
+
+
+def _features(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    # log returns of the close, and log distance of High / Low to the close,
+    # over the bars that have all three prices
+    close = df['Adj Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    valid = np.isfinite(close) & np.isfinite(high) & np.isfinite(low) & (close > 0)
+    close, high, low = close[valid], high[valid], low[valid]
+    returns = np.diff(np.log(close))
+    return returns, np.log(high[1:] / close[1:]), np.log(low[1:] / close[1:]), float(close[0])
+
+
+def _synthetic(features, method: str, block: int, rng: np.random.Generator):
+    # one path of close, high and low prices with as many bars as the history
+    returns, hi, lo, first = features
+    m = len(returns)
+    if method == 'block':
+        block = min(block, m)
+        starts = rng.integers(0, m - block + 1, size=-(-m // block))
+        idx = (starts[:, None] + np.arange(block)).ravel()[:m]
+    elif method == 'stationary':
+        # a new block starts with probability 1 / block, else the previous
+        # one continues (wrapping around the end of the history)
+        restart = rng.random(m) < 1 / block
+        restart[0] = True
+        seg = np.cumsum(restart) - 1
+        starts = rng.integers(0, m, size=seg[-1] + 1)
+        offset = np.arange(m) - np.flatnonzero(restart)[seg]
+        idx = (starts[seg] + offset) % m
+    else:
+        idx = rng.integers(0, m, size=m)
+    if method == 'gbm':
+        path_returns = rng.normal(returns.mean(), returns.std(), size=m)
+    else:
+        path_returns = returns[idx]
+    close = np.empty(m + 1)
+    close[0] = first
+    close[1:] = first * np.exp(np.cumsum(path_returns))
+    high = close.copy()
+    low = close.copy()
+    high[1:] *= np.exp(hi[idx])
+    low[1:] *= np.exp(lo[idx])
+    return close, high, low
+
+
+def _sweep_paths(features, periods, transaction_cost, method, block, mode, select, chosen, seeds):
+    # best period index, its gross / net return and the chosen period's
+    # gross / net return for every path; the averages of synthetic paths
+    # are never seen again, so they bypass the indicator cache
+    out = np.empty((len(seeds), 5))
+    for i, s in enumerate(seeds):
+        close, high, low = _synthetic(features, method, block, np.random.default_rng(s))
+        path = pd.DataFrame({'Adj Close': close, 'High': high, 'Low': low})
+        res = hilo_matrix(path, periods, transaction_cost, cache=None, modes=[mode])
+        gross = res['Cumulative Return'][0, :, -1]
+        net = res['Cumulative Return (net)'][0, :, -1]
+        score = gross if select == 'Cumulative Return %' else net
+        best = int(np.argmax(np.where(np.isnan(score), -np.inf, score)))
+        out[i] = (best, gross[best], net[best], gross[chosen], net[chosen])
+    return out
@@ -0,0 +1,211 @@
+# search.py
+import itertools
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from strategy import hilo_combos
+
+SCORES = ('Cumulative Return %', 'Cumulative Return (net) %')
+
+
+@dataclass
+class SearchResult:
+    """
+    Outcome of search_hilo: one table row per evaluated (Hi Period,
+    Lo Period, Band) combination, the stage ('Round') it was last scored
+    in, and how long the evaluations took.
+    """
+    table: pd.DataFrame
+    select: str
+    seconds: float
+    rounds: list = field(default_factory=list)
+
+    @property
+    def evaluations(self) -> int:
+        return int(sum(r['Evaluations'] for r in self.rounds))
+
+    @property
+    def seconds_per_evaluation(self) -> float:
+        return self.seconds / self.evaluations if self.evaluations else float('nan')
+
+    def best(self) -> dict:
+        """
+        The best combination scored on the full history, as a dict.
+        """
+        full = self.table[self.table['Bars'] == self.table['Bars'].max()]
+        score = full[self.select].fillna(-np.inf)
+        return full.loc[score.idxmax()].to_dict()
+
+    def heatmap(self, column: str = None, band: float = None) -> pd.DataFrame:
+        """
+        (Hi Period × Lo Period) matrix of 'column' (default: the selection
+        score) for one band, NaN where a combination was not evaluated on
+        the full history. Ready for e.g. seaborn.heatmap or imshow.
+        """
+        column = column or self.select
+        full = self.table[self.table['Bars'] == self.table['Bars'].max()]
+        if band is None:
+            band = self.best()['Band']
+        full = full[full['Band'] == band]
+        return full.pivot(index='Hi Period', columns='Lo Period', values=column)
+
+
+def search_hilo(
+    df: pd.DataFrame,
+    hi_periods: range,
+    lo_periods: range,
+    transaction_cost: float,
+    bands=(0.0,),
+    method: str = 'grid',
+    select: str = 'Cumulative Return (net) %',
+    mode: str = 'long-short',
+    keep: float = 0.25,
+    top: int = 5,
+    max_cells: int = 2_000_000,
+    progress=None
+) -> SearchResult:
+    """
+    Search separate Avg Hi / Avg Lo windows and band offsets.
+
+    method='grid' scores every combination. 'coarse' scores a strided grid
+    first and then refines around the 'top' best cells, halving the stride
+    until it reaches 1. 'halving' (successive halving) scores all
+    combinations on a short head of the history, keeps the best 'keep'
+    fraction and doubles the history each round until the survivors are
+    scored on all bars.
+
+    Combinations are scored in batches of at most 'max_cells' matrix cells;
+    progress(done, total) is called after each batch with the combinations
+    scored so far in the current round and the size of that round.
+    """
+    if select not in SCORES:
+        raise KeyError(f"Unknown selection column: {select}")
+    hi_periods = np.unique(np.asarray(list(hi_periods), dtype=np.int64))
+    lo_periods = np.unique(np.asarray(list(lo_periods), dtype=np.int64))
+    bands = np.unique(np.asarray(list(bands), dtype=np.float64))
+    grid = np.array(list(itertools.product(hi_periods, lo_periods, bands)), dtype=np.float64)
+    if len(grid) == 0 or len(df) == 0:
+        raise ValueError('Nothing to search: empty parameter grid or data.')
+
+    search = _Search(df, transaction_cost, mode, select, max_cells, progress)
+    if method == 'grid':
+        search.evaluate(grid, len(df), 'grid')
+    elif method == 'coarse':
+        _coarse_to_fine(search, hi_periods, lo_periods, bands, top)
+    elif method == 'halving':
+        _successive_halving(search, grid, keep)
+    else:
+        raise ValueError(f"Unknown search method: {method}")
+    return search.result()
+
+
+class _Search:
+    # scores batches of combinations and keeps the records and timings
+
+    def __init__(self, df, transaction_cost, mode, select, max_cells, progress):
+        self.df = df
+        self.transaction_cost = transaction_cost
+        self.mode = mode
+        self.select = select
+        self.max_cells = max_cells
+        self.progress = progress
+        self.parts = []
+        self.rounds = []
+        self.seen = set()
+        self.seconds = 0.0
+
+    def evaluate(self, combos: np.ndarray, bars: int, name: str) -> pd.DataFrame:
+        # score 'combos' (rows of hi, lo, band) on the first 'bars' bars
+        head = self.df.iloc[:bars]
+        t0 = time.perf_counter()
+        block = max(1, self.max_cells // max(bars, 1))
+        gross = np.empty(len(combos))
+        net = np.empty(len(combos))
+        for i in range(0, len(combos), block):
+            part = combos[i:i + block]
+            res = hilo_combos(head, part[:, 0], part[:, 1], self.transaction_cost,
+                              bands=part[:, 2], modes=[self.mode])
+            gross[i:i + block] = res['Cumulative Return'][0, :, -1]
+            net[i:i + block] = res['Cumulative Return (net)'][0, :, -1]
+            if self.progress is not None:
+                self.progress(min(i + block, len(combos)), len(combos))
+        seconds = time.perf_counter() - t0
+        self.seconds += seconds
+        self.seen.update(map(tuple, combos))
+        self.rounds.append({'Round': name, 'Evaluations': len(combos), 'Bars': bars,
+                            'Seconds': seconds,
+                            'Seconds per Evaluation': seconds / max(len(combos), 1)})
+        table = pd.DataFrame({
+            'Hi Period': combos[:, 0].astype(np.int64),
+            'Lo Period': combos[:, 1].astype(np.int64),
+            'Band': combos[:, 2],
+            'Cumulative Return %': gross,
+            'Cumulative Return (net) %': net,
+            'Round': name,
+            'Bars': bars,
+        })
+        self.parts.append(table)
+        return table
+
+    def unseen(self, combos: np.ndarray) -> np.ndarray:
+        keep = [tuple(c) not in self.seen for c in combos]
+        return combos[np.asarray(keep, dtype=bool)] if len(combos) else combos
+
+    def result(self) -> SearchResult:
+        table = pd.concat(self.parts, ignore_index=True)
+        # a combination scored in several rounds keeps its last (longest) score
+        table = table.drop_duplicates(['Hi Period', 'Lo Period', 'Band'], keep='last')
+        table = table.sort_values(['Band', 'Hi Period', 'Lo Period']).reset_index(drop=True)
+        return SearchResult(table, self.select, self.seconds, self.rounds)
+
+
+def _coarse_to_fine(search: _Search, hi_periods: np.ndarray, lo_periods: np.ndarray,
+                    bands: np.ndarray, top: int):
+    # start with about 10 values per window axis, then refine around the
+    # best cells with half the stride each round
+    stride = max(1, max(len(hi_periods), len(lo_periods)) // 10)
+    hi_idx = np.arange(0, len(hi_periods), stride)
+    lo_idx = np.arange(0, len(lo_periods), stride)
+    combos = _combos(hi_periods[hi_idx], lo_periods[lo_idx], bands)
+    n = len(search.df)
+    scored = search.evaluate(combos, n, f'stride {stride}')
+    best = scored
+    while stride > 1:
+        stride = max(1, stride // 2)
+        leaders = best.nlargest(top, search.select)
+        near = []
+        for _, row in leaders.iterrows():
+            hi = np.searchsorted(hi_periods, row['Hi Period'])
+            lo = np.searchsorted(lo_periods, row['Lo Period'])
+            his = hi_periods[np.clip(hi + np.arange(-2, 3) * stride, 0, len(hi_periods) - 1)]
+            los = lo_periods[np.clip(lo + np.arange(-2, 3) * stride, 0, len(lo_periods) - 1)]
+            near.append(_combos(np.unique(his), np.unique(los), [row['Band']]))
+        combos = search.unseen(np.unique(np.vstack(near), axis=0))
+        if len(combos):
+            search.evaluate(combos, n, f'stride {stride}')
+        best = pd.concat(search.parts, ignore_index=True)
+
+
+def _successive_halving(search: _Search, grid: np.ndarray, keep: float):
+    # the first round sees n / 2**rounds bars; every round doubles that,
+    # and the last one scores the survivors on the full history
+    # the shortest head still needs room for the longest windows to warm up
+    n = len(search.df)
+    min_bars = 2 * int(grid[:, :2].max()) + 1
+    rounds = int(np.floor(np.log(len(grid)) / np.log(1 / keep)))
+    rounds = max(0, min(rounds, int(np.floor(np.log2(n / min_bars))) if n > min_bars else 0))
+    survivors = grid
+    for r in range(rounds, -1, -1):
+        bars = max(1, int(np.ceil(n / 2 ** r)))
+        scored = search.evaluate(survivors, bars, f'{bars} bars')
+        if r == 0:
+            break
+        count = max(1, int(np.ceil(len(survivors) * keep)))
+        order = np.argsort(-scored[search.select].fillna(-np.inf).to_numpy(), kind='stable')
+        survivors = survivors[order[:count]]
+
+
+def _combos(hi: np.ndarray, lo: np.ndarray, bands) -> np.ndarray:
+    return np.array(list(itertools.product(hi, lo, bands)), dtype=np.float64)
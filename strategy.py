@@ -1,26 +1,64 @@
 # strategy.py
+import logging
+
 import numpy as np
 import pandas as pd
+from execution import ExecutionModel
+from indicators import CACHE, IndicatorCache, fingerprint, rolling_mean
+from metrics import ffill_curves
+
+log = logging.getLogger(__name__)
+
+# position modes:
+#   long-short  always in the market, long after a buy and short after a sell
+#   long-only   long after a buy, flat after a sell
+#   short-only  short after a sell, flat after a buy
+#   flat        long above Avg Hi, short below Avg Lo, flat between the bands
+MODES = ('long-short', 'long-only', 'short-only', 'flat')
 
 
-def compute_hilo(df: pd.DataFrame, period: int, transaction_cost: float) -> pd.DataFrame:
+def compute_hilo(df: pd.DataFrame, period: int, transaction_cost: float,
+                 compact: bool = False, equity_dtype=np.float64,
+                 mode: str = 'long-short', lo_period: int = None,
+                 band: float = 0.0, execution: ExecutionModel = None) -> pd.DataFrame:
     """
     Apply HiLo strategy: rolling average high/low, generate signals, calculate returns.
+
+    'mode' is one of MODES and decides which side(s) of the signal are traded.
+    Avg Lo uses 'lo_period' bars if given (default: 'period'). With a
+    'band' > 0 a buy needs a close above Avg Hi × (1 + band) and a sell a
+    close below Avg Lo × (1 - band).
+
+    With compact=True a HiLoResult is returned instead: it only stores the
+    int8 positions and the gross/net equity curves (as 'equity_dtype', e.g.
+    np.float32) and derives the other columns when they are asked for.
+
+    With an 'execution' model the fills, spread, slippage and fixed fees
+    it describes replace the flat fee charged at the signal close.
     """
+    if compact and execution is not None:
+        raise ValueError('Compact results only support the flat transaction cost.')
+    if compact:
+        return HiLoResult.from_data(df, period, transaction_cost, equity_dtype, mode,
+                                    lo_period, band)
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+
     # Make a copy so original df isn't modified
     df = df.copy()
 
     # Calculate rolling average of the High prices over 'period' days
-    df['Avg Hi'] = df['High'].rolling(window=period).mean()
-    # Calculate rolling average of the Low prices over 'period' days
-    df['Avg Lo'] = df['Low'].rolling(window=period).mean()
+    # (reused from the indicator cache when this data was seen before)
+    df['Avg Hi'] = rolling_mean(df['High'], period).copy()
+    # Calculate rolling average of the Low prices over 'lo_period' days
+    df['Avg Lo'] = rolling_mean(df['Low'], lo_period or period).copy()
 
     # Initialize the 'Signal' column with NaN
     df['Signal'] = np.nan
-    # A 'buy' signal when today's close > yesterday's Avg Hi
-    buy = df['Adj Close'] > df['Avg Hi'].shift(1)
-    # A 'sell' signal when today's close < yesterday's Avg Lo
-    sell = df['Adj Close'] < df['Avg Lo'].shift(1)
+    # A 'buy' signal when today's close > yesterday's Avg Hi (plus the band)
+    buy = df['Adj Close'] > df['Avg Hi'].shift(1) * (1 + band)
+    # A 'sell' signal when today's close < yesterday's Avg Lo (minus the band)
+    sell = df['Adj Close'] < df['Avg Lo'].shift(1) * (1 - band)
 
     # Assign 1 for buy signals, -1 for sell signals
     # This creates a new column 'Signal' with 1 for buy, -1 for sell, and NaN otherwise
@@ -30,6 +68,13 @@ def compute_hilo(df: pd.DataFrame, period: int, transaction_cost: float) -> pd.D
     # Carry forward the last non-NaN signal to represent current position
     # .ffill() fills forward, .fillna(0) ensures any NaN (which always includes the first row) is set to 0
     df['Position'] = df['Signal'].ffill().fillna(0)
+    if mode == 'long-only':
+        df['Position'] = df['Position'].clip(lower=0)
+    elif mode == 'short-only':
+        df['Position'] = df['Position'].clip(upper=0)
+    elif mode == 'flat':
+        # no carrying forward: flat whenever the close is between the bands
+        df['Position'] = df['Signal'].fillna(0)
 
     # 1) magnitude of position change (0,1,2, etc.)
     trade_qty = df['Position'].diff().abs().fillna(0)
@@ -70,14 +115,500 @@ def compute_hilo(df: pd.DataFrame, period: int, transaction_cost: float) -> pd.D
     # 6) build a second cumulative curve that includes the drag of fees
     df['Cumulative Return (net)'] = df['Net Strategy Return'].cumprod()
 
+    if execution is not None:
+        # the execution model's fills and costs replace steps 3) to 6)
+        gross, net, cost_pct, strategy_return = execution_returns(
+            df, df['Position'].to_numpy(dtype=np.float64)[None, :], transaction_cost, execution)
+        df['Cost Pct'] = cost_pct[0]
+        df['Cost'] = df['Cost Pct'] * df['Adj Close']
+        df['Strategy Return'] = strategy_return[0]
+        df['Cumulative Return'] = gross[0]
+        df['Net Strategy Return'] = df['Strategy Return'] - df['Cost Pct']
+        df['Cumulative Return (net)'] = net[0]
+
     # ————————————————————————————————————————————————————
     # after compute_hilo(df, best, cost) → yields final_df
-    total_trades = df['Position'].diff().abs().sum()
-    total_fees = df['Cost'].sum()
-    print(df['Cost'])
-    print(f"Total trades(unit changes): {total_trades: .0f}")
-    # assuming price in AUD
-    print(f"Total fees paid: {total_fees: .2f} AUD ")
+    # only summed when someone listens; the whole Cost series only at DEBUG
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Cost:\n%s", df['Cost'])
+    if log.isEnabledFor(logging.INFO):
+        total_trades = df['Position'].diff().abs().sum()
+        total_fees = df['Cost'].sum()
+        log.info("Total trades(unit changes): %.0f", total_trades)
+        # assuming price in AUD
+        log.info("Total fees paid: %.2f AUD", total_fees)
 
     # Return the enriched DataFrame
     return df
+
+
+# ————————————————————————————————————————————————————
+# Batched (periods × bars) kernels used by the optimizer sweep.
+# They reproduce compute_hilo operation-for-operation on NumPy arrays
+# so the sweep results are identical to the per-period DataFrame path.
+
+def rolling_mean_matrix(values: np.ndarray, periods) -> np.ndarray:
+    """
+    Rolling means of a 1-D array for every window in 'periods' at once.
+
+    One cumulative-sum pass serves all windows; row i holds the rolling mean
+    over periods[i] bars, NaN until a full window of valid values is seen
+    (same as pandas rolling(window).mean()).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = np.asarray(periods, dtype=np.int64)
+    n = values.shape[0]
+    valid = ~np.isnan(values)
+    # centre the series before summing to keep cancellation error small
+    offset = values[valid].mean() if valid.any() else 0.0
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values - offset, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+
+    out = np.full((periods.shape[0], n), np.nan)
+    for i, p in enumerate(periods):
+        if p > n:
+            continue
+        # window (end - p, end] for every bar that has a full window
+        window_sum = csum[p:] - csum[:n + 1 - p]
+        window_count = ccount[p:] - ccount[:n + 1 - p]
+        row = out[i, p - 1:]
+        np.divide(window_sum, p, out=row)
+        row += offset
+        row[window_count < p] = np.nan
+    return out
+
+
+def hilo_signals(close: np.ndarray, avg_hi: np.ndarray, avg_lo: np.ndarray,
+                 band: np.ndarray = None) -> np.ndarray:
+    """
+    Signals (1 buy, -1 sell, NaN between the bands) for each row of the
+    (periods × bars) Avg Hi / Avg Lo matrices. 'band' is the band offset,
+    a scalar or one value per row.
+    """
+    hi = avg_hi[:, :-1]
+    lo = avg_lo[:, :-1]
+    if band is not None:
+        band = np.reshape(band, (-1, 1))
+        hi = hi * (1 + band)
+        lo = lo * (1 - band)
+    # compare today's close with yesterday's averages;
+    # sell is assigned after buy in compute_hilo, so it wins on conflicts
+    signal = np.full(avg_hi.shape, np.nan)
+    np.copyto(signal[:, 1:], 1.0, where=close[1:] > hi)
+    np.copyto(signal[:, 1:], -1.0, where=close[1:] < lo)
+    return signal
+
+
+def hilo_positions(close: np.ndarray, avg_hi: np.ndarray, avg_lo: np.ndarray,
+                   signal: np.ndarray = None) -> np.ndarray:
+    """
+    Positions (1 long, -1 short, 0 before the first signal) for each row of
+    the (periods × bars) Avg Hi / Avg Lo matrices. Pass 'signal' if the
+    hilo_signals() matrix is already at hand.
+    """
+    if signal is None:
+        signal = hilo_signals(close, avg_hi, avg_lo)
+
+    # forward fill the last signal along each row, 0 before the first one
+    has_signal = ~np.isnan(signal)
+    last = np.where(has_signal, np.arange(signal.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    position = np.take_along_axis(signal, last, axis=1)
+    position[np.isnan(position)] = 0.0
+    return position
+
+
+def mode_positions(signal: np.ndarray, position: np.ndarray, modes) -> np.ndarray:
+    """
+    Stack the positions of every mode in 'modes' into a (modes × periods × bars)
+    array. All modes derive from the same signal and long-short position
+    matrices, so no mode needs its own pass over the averages.
+    """
+    out = np.empty((len(modes),) + position.shape)
+    for m, mode in enumerate(modes):
+        if mode == 'long-short':
+            out[m] = position
+        elif mode == 'long-only':
+            np.maximum(position, 0.0, out=out[m])
+        elif mode == 'short-only':
+            np.minimum(position, 0.0, out=out[m])
+        elif mode == 'flat':
+            out[m] = signal
+            out[m][np.isnan(signal)] = 0.0
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+    return out
+
+
+def hilo_returns(close: np.ndarray, position: np.ndarray, transaction_cost: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gross and net cumulative return curves for a (periods × bars) position matrix.
+    """
+    # trade size and fee drag, in the same operation order as compute_hilo
+    trade_qty = np.zeros_like(position)
+    trade_qty[:, 1:] = np.abs(np.diff(position, axis=1))
+    cost_pct = trade_qty * close * transaction_cost / close
+
+    # pct_change() pads missing prices before dividing
+    filled = close
+    if np.isnan(close).any():
+        last = np.where(~np.isnan(close), np.arange(close.shape[0]), 0)
+        filled = close[np.maximum.accumulate(last)]
+    daily_return = np.full(close.shape, np.nan)
+    daily_return[1:] = filled[1:] / filled[:-1] - 1
+
+    # long and short multipliers only depend on the bar, not the period;
+    # the first bar has no previous position, so its multiplier is 1
+    long_return = 1 + daily_return[1:]
+    short_return = 1 / (1 + daily_return[1:])
+    prev_pos = position[:, :-1]
+    strategy_return = np.ones_like(position)
+    strategy_return[:, 1:] = np.where(
+        prev_pos == 1,
+        long_return,
+        np.where(prev_pos == -1, short_return, 1.0)
+    )
+    net_return = strategy_return - cost_pct
+    return _nan_cumprod(strategy_return), _nan_cumprod(net_return)
+
+
+def execution_returns(df: pd.DataFrame, position: np.ndarray, transaction_cost: float,
+                      execution: ExecutionModel) -> tuple[np.ndarray, ...]:
+    """
+    hilo_returns under an ExecutionModel: the gross and net cumulative
+    return curves, the cost as a fraction of each bar's starting equity and
+    the gross per-bar multipliers, for a (rows × bars) position matrix.
+    """
+    strategy_return, cost_pct, fixed = execution.costs(df, position, transaction_cost)
+    net_return = strategy_return - cost_pct
+    growth = _nan_cumprod(net_return)
+    # like the proportional cost, no fee is charged on bars without a price
+    fixed = np.where(np.isnan(net_return), 0.0, fixed)
+    if fixed.any():
+        # equity e[t] = e[t-1] * net_return[t] - fixed[t] solves to
+        # e[t] = growth[t] * (1 - sum(fixed[k] / growth[k] for k <= t)),
+        # so fixed fees need no loop over the bars either
+        paid = np.cumsum(np.where(fixed > 0, fixed / np.where(fixed > 0, growth, 1.0), 0.0), axis=1)
+        net = growth * (1 - paid)
+        # report each fixed fee as a share of the equity it is paid from
+        start = np.ones_like(net)
+        start[:, 1:] = ffill_curves(net)[:, :-1]
+        cost_pct = cost_pct + fixed / start
+    else:
+        net = growth
+    return _nan_cumprod(strategy_return), net, cost_pct, strategy_return
+
+
+def _nan_cumprod(values: np.ndarray) -> np.ndarray:
+    # pandas' cumprod skips NaNs instead of propagating them
+    nan = np.isnan(values)
+    if not nan.any():
+        return np.cumprod(values, axis=1)
+    out = np.cumprod(np.where(nan, 1.0, values), axis=1)
+    out[nan] = np.nan
+    return out
+
+
+def hilo_matrix(df: pd.DataFrame, periods, transaction_cost: float,
+                cache: IndicatorCache = CACHE, modes=None,
+                execution: ExecutionModel = None) -> dict:
+    """
+    Vectorized compute_hilo for many periods: returns the Avg Hi, Avg Lo,
+    Position, Cumulative Return and Cumulative Return (net) matrices,
+    one row per period.
+
+    With a list of 'modes' every mode × period combination is evaluated in
+    the same pass: Position and the return curves then have shape
+    (modes × periods × bars). An 'execution' model prices the fills as in
+    compute_hilo.
+    """
+    return hilo_combos(df, periods, periods, transaction_cost, cache=cache, modes=modes,
+                       execution=execution)
+
+
+def hilo_combos(df: pd.DataFrame, hi_periods, lo_periods, transaction_cost: float,
+                bands=0.0, cache: IndicatorCache = CACHE, modes=None,
+                execution: ExecutionModel = None) -> dict:
+    """
+    hilo_matrix for explicit parameter combinations: row i uses an Avg Hi
+    over hi_periods[i] bars, an Avg Lo over lo_periods[i] bars and band
+    offset bands[i] (a scalar applies to every row). Each distinct window
+    is averaged once however many combinations share it.
+    """
+    hi_periods = np.asarray(hi_periods, dtype=np.int64)
+    lo_periods = np.asarray(lo_periods, dtype=np.int64)
+    bands = np.broadcast_to(np.asarray(bands, dtype=np.float64), hi_periods.shape)
+    close = df['Adj Close'].to_numpy(dtype=np.float64)
+
+    hi_windows, hi_row = np.unique(hi_periods, return_inverse=True)
+    lo_windows, lo_row = np.unique(lo_periods, return_inverse=True)
+    band_values = np.unique(bands)
+    avg_hi = _guarded_rows(df['High'], hi_windows, close, 1 + band_values, cache)[hi_row]
+    avg_lo = _guarded_rows(df['Low'], lo_windows, close, 1 - band_values, cache)[lo_row]
+
+    signal = hilo_signals(close, avg_hi, avg_lo, bands if band_values.any() else None)
+    position = hilo_positions(close, avg_hi, avg_lo, signal)
+    if modes is not None:
+        # one returns pass over all modes, stacked as (modes · periods) rows
+        position = mode_positions(signal, position, modes)
+    rows = position.reshape(-1, len(close))
+    if execution is None:
+        gross, net = hilo_returns(close, rows, transaction_cost)
+    else:
+        gross, net, _, _ = execution_returns(df, rows, transaction_cost, execution)
+    gross = gross.reshape(position.shape)
+    net = net.reshape(position.shape)
+    return {
+        'Avg Hi': avg_hi,
+        'Avg Lo': avg_lo,
+        'Position': position,
+        'Cumulative Return': gross,
+        'Cumulative Return (net)': net,
+    }
+
+
+def hilo_panel(close: np.ndarray, high: np.ndarray, low: np.ndarray, periods,
+               transaction_cost: float, lo_periods=None, band: float = 0.0,
+               mode: str = 'long-short') -> dict:
+    """
+    compute_hilo for many symbols at once: every input is a (symbols ×
+    bars) array on a shared calendar (see data.align_bars), NaN where a
+    symbol has no bar, and row i trades a HiLo of periods[i] (lo_periods[i]
+    for Avg Lo) bars. Returns the Position, Strategy Return, Cost Pct,
+    Cumulative Return and Cumulative Return (net) matrices.
+
+    Averages and signals are taken over each symbol's own bars, so a stock
+    next to 24/7 crypto still averages trading days. Positions are held
+    over the bars a symbol does not trade, which earn nothing, so every row
+    equals that symbol's own compute_hilo curve spread out over the shared
+    calendar.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    n_rows, n = close.shape
+    periods = np.broadcast_to(np.asarray(periods, dtype=np.int64), (n_rows,))
+    lo_periods = periods if lo_periods is None else np.broadcast_to(
+        np.asarray(lo_periods, dtype=np.int64), (n_rows,))
+
+    # move each row's bars to the front, in order, with the gaps behind them
+    valid = ~np.isnan(close)
+    order = np.argsort(~valid, axis=1, kind='stable')
+    packed_valid = np.take_along_axis(valid, order, axis=1)
+    packed = {}
+    for name, values in (('close', close), ('high', high), ('low', low)):
+        values = np.take_along_axis(values, order, axis=1)
+        values[~packed_valid] = np.nan
+        packed[name] = values
+
+    # pandas rolls all columns sharing a window in one call, with the same
+    # rounding as compute_hilo
+    avg_hi = np.empty((n_rows, n))
+    avg_lo = np.empty((n_rows, n))
+    for avg, values, windows in ((avg_hi, packed['high'], periods), (avg_lo, packed['low'], lo_periods)):
+        for window in np.unique(windows):
+            rows = np.flatnonzero(windows == window)
+            frame = pd.DataFrame(values[rows].T)
+            avg[rows] = frame.rolling(window=int(window)).mean().to_numpy().T
+
+    signal = np.full((n_rows, n), np.nan)
+    hi = avg_hi[:, :-1] * (1 + band) if band else avg_hi[:, :-1]
+    lo = avg_lo[:, :-1] * (1 - band) if band else avg_lo[:, :-1]
+    np.copyto(signal[:, 1:], 1.0, where=packed['close'][:, 1:] > hi)
+    np.copyto(signal[:, 1:], -1.0, where=packed['close'][:, 1:] < lo)
+    position = hilo_positions(packed['close'], avg_hi, avg_lo, signal)
+    position = mode_positions(signal, position, [mode])[0]
+
+    # back onto the shared calendar, holding positions over the gaps
+    spread = np.full((n_rows, n), np.nan)
+    np.put_along_axis(spread, order, np.where(packed_valid, position, np.nan), axis=1)
+    last = np.where(valid, np.arange(n), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    position = np.take_along_axis(spread, last, axis=1)
+    position[np.isnan(position)] = 0.0
+    filled = np.take_along_axis(close, last, axis=1)
+
+    trade_qty = np.zeros_like(position)
+    trade_qty[:, 1:] = np.abs(np.diff(position, axis=1))
+    # same operation order as compute_hilo; no fees before a symbol's first bar
+    cost_pct = trade_qty * filled * transaction_cost / filled
+    cost_pct[np.isnan(cost_pct)] = 0.0
+    daily_return = filled[:, 1:] / filled[:, :-1] - 1
+    prev_pos = position[:, :-1]
+    strategy_return = np.ones_like(position)
+    strategy_return[:, 1:] = np.where(
+        prev_pos == 1,
+        1 + daily_return,
+        np.where(prev_pos == -1, 1 / (1 + daily_return), 1.0)
+    )
+    return {
+        'Position': position,
+        'Strategy Return': strategy_return,
+        'Cost Pct': cost_pct,
+        'Cumulative Return': _nan_cumprod(strategy_return),
+        'Cumulative Return (net)': _nan_cumprod(strategy_return - cost_pct),
+    }
+
+
+def _guarded_rows(series: pd.Series, periods: np.ndarray, close: np.ndarray,
+                  scales: np.ndarray, cache: IndicatorCache) -> np.ndarray:
+    # A cumulative-sum mean can differ from pandas' rolling mean in the last
+    # bits. Where that could flip a close-vs-average comparison (for any of
+    # the band 'scales'), recompute the row with pandas so the signals stay
+    # identical to compute_hilo.
+    rows, exact = _rolling_rows(series, periods, cache)
+    tol = 1e-9 * np.abs(close[1:])
+    near = np.zeros(len(periods), dtype=bool)
+    for scale in scales:
+        near |= (np.abs(close[1:] - rows[:, :-1] * scale) <= tol).any(axis=1)
+    for i in np.flatnonzero(near & ~exact):
+        rows[i] = rolling_mean(series, int(periods[i]), cache)
+    return rows
+
+
+def _rolling_rows(series: pd.Series, periods: np.ndarray, cache: IndicatorCache) -> tuple[np.ndarray, np.ndarray]:
+    # Rolling-mean rows for every period, plus a flag per row telling whether
+    # it is pandas-exact. Cached rows are reused (exact ones preferred); the
+    # rest come from one cumulative-sum pass and are cached for the next sweep.
+    values = series.to_numpy(dtype=np.float64)
+    if cache is None:
+        return rolling_mean_matrix(values, periods), np.zeros(len(periods), dtype=bool)
+
+    fp = fingerprint(values)
+    out = np.empty((len(periods), len(values)))
+    exact = np.zeros(len(periods), dtype=bool)
+    missing = []
+    for i, p in enumerate(periods):
+        key, row = cache.find((fp, series.name, int(p), 'mean'),
+                              (fp, series.name, int(p), 'cumsum'))
+        if row is None:
+            missing.append(i)
+            continue
+        out[i] = row
+        exact[i] = key[3] == 'mean'
+    if missing:
+        rows = rolling_mean_matrix(values, periods[missing])
+        for i, row in zip(missing, rows):
+            out[i] = row
+            cache.put((fp, series.name, int(periods[i]), 'cumsum'), row)
+    return out, exact
+
+
+class HiLoResult:
+    """
+    Compact compute_hilo result backed by typed arrays.
+
+    Only the positions (int8) and the gross/net cumulative returns are kept;
+    result['Cost'], result['Signal'] etc. are derived from them and the
+    source prices on request, with the same values as compute_hilo.
+    to_frame() builds the full DataFrame. The source frame is referenced,
+    not copied, so it must not be modified while the result is in use.
+    """
+
+    COLUMNS = ['Avg Hi', 'Avg Lo', 'Signal', 'Position', 'Cost', 'Cost Pct',
+               'Daily Return', 'Strategy Return', 'Cumulative Return',
+               'Net Strategy Return', 'Cumulative Return (net)']
+
+    def __init__(self, source: pd.DataFrame, period: int, transaction_cost: float,
+                 position: np.ndarray, gross: np.ndarray, net: np.ndarray,
+                 mode: str = 'long-short', lo_period: int = None, band: float = 0.0):
+        self.source = source
+        self.period = period
+        self.transaction_cost = transaction_cost
+        self.mode = mode
+        self.lo_period = lo_period or period
+        self.band = band
+        self.position = position
+        self.gross = gross
+        self.net = net
+
+    @classmethod
+    def from_data(cls, df: pd.DataFrame, period: int, transaction_cost: float,
+                  equity_dtype=np.float64, mode: str = 'long-short',
+                  lo_period: int = None, band: float = 0.0) -> 'HiLoResult':
+        res = hilo_combos(df, [period], [lo_period or period], transaction_cost,
+                          bands=band, modes=[mode])
+        return cls(
+            df, period, transaction_cost,
+            position=res['Position'][0, 0].astype(np.int8),
+            gross=res['Cumulative Return'][0, 0].astype(equity_dtype),
+            net=res['Cumulative Return (net)'][0, 0].astype(equity_dtype),
+            mode=mode,
+            lo_period=lo_period,
+            band=band,
+        )
+
+    @property
+    def index(self) -> pd.Index:
+        return self.source.index
+
+    @property
+    def nbytes(self) -> int:
+        return self.position.nbytes + self.gross.nbytes + self.net.nbytes
+
+    @property
+    def total_trades(self) -> float:
+        return float(np.abs(np.diff(self.position.astype(np.float64))).sum())
+
+    @property
+    def total_fees(self) -> float:
+        return float(np.nansum(self['Cost'].to_numpy()))
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.COLUMNS or column in self.source.columns
+
+    def __getitem__(self, column: str) -> pd.Series:
+        return pd.Series(self._derive(column), index=self.index, name=column)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Full per-bar DataFrame with the same columns as compute_hilo.
+        """
+        df = self.source.copy()
+        for column in self.COLUMNS:
+            df[column] = self._derive(column)
+        return df
+
+    def _derive(self, column: str) -> np.ndarray:
+        close = self.source['Adj Close'].to_numpy(dtype=np.float64)
+        position = self.position.astype(np.float64)
+        if column in self.source.columns:
+            return self.source[column].to_numpy()
+        if column == 'Position':
+            return position
+        if column == 'Cumulative Return':
+            return self.gross
+        if column == 'Cumulative Return (net)':
+            return self.net
+        if column in ('Avg Hi', 'Avg Lo'):
+            if column == 'Avg Hi':
+                return rolling_mean(self.source['High'], self.period).copy()
+            return rolling_mean(self.source['Low'], self.lo_period).copy()
+        if column == 'Signal':
+            avg_hi = self._derive('Avg Hi')
+            avg_lo = self._derive('Avg Lo')
+            signal = np.full(close.shape, np.nan)
+            np.copyto(signal[1:], 1.0, where=close[1:] > avg_hi[:-1] * (1 + self.band))
+            np.copyto(signal[1:], -1.0, where=close[1:] < avg_lo[:-1] * (1 - self.band))
+            return signal
+        if column in ('Cost', 'Cost Pct'):
+            trade_qty = np.zeros_like(position)
+            trade_qty[1:] = np.abs(np.diff(position))
+            cost = trade_qty * close * self.transaction_cost
+            return cost if column == 'Cost' else cost / close
+        if column == 'Daily Return':
+            return self.source['Adj Close'].pct_change().to_numpy()
+        if column in ('Strategy Return', 'Net Strategy Return'):
+            daily_return = self._derive('Daily Return')
+            strategy_return = np.ones_like(position)
+            strategy_return[1:] = np.where(
+                position[:-1] == 1,
+                1 + daily_return[1:],
+                np.where(position[:-1] == -1, 1 / (1 + daily_return[1:]), 1.0)
+            )
+            if column == 'Strategy Return':
+                return strategy_return
+            return strategy_return - self._derive('Cost Pct')
+        raise KeyError(column)
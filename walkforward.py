@@ -0,0 +1,125 @@
+# walkforward.py
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from metrics import ffill_curves
+from strategy import hilo_matrix, hilo_returns
+
+
+def walk_forward(
+    df: pd.DataFrame,
+    periods: range,
+    transaction_cost: float,
+    train: int,
+    test: int,
+    expanding: bool = False,
+    select: str = 'Cumulative Return %',
+    workers: int = 1,
+    max_cells: int = 2_000_000
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Walk-forward HiLo optimization.
+
+    Each training window of 'train' bars (rolling, or growing from the first
+    bar if 'expanding') picks the period with the best 'select' column, and
+    that period trades the following 'test' bars. Returns a table with one
+    row per window and the stitched out-of-sample backtest.
+
+    The rolling averages and equity curves are computed once over the full
+    history (they only use past bars), so every window's in-sample return is
+    a ratio of two points on those curves instead of a fresh sweep. With
+    workers > 1 the period blocks are swept in a process pool.
+    """
+    n = len(df)
+    periods = np.asarray(list(periods), dtype=np.int64)
+    bounds = _windows(n, train, test, expanding)
+    if not bounds:
+        raise ValueError(f"Need more than {train} bars for a {train}-bar training window; got {n}.")
+    starts = np.array([b[0] for b in bounds])
+    ends = np.array([b[1] for b in bounds])
+
+    # in-sample returns of every period in every training window
+    block = max(1, max_cells // max(n, 1))
+    blocks = [periods[i:i + block] for i in range(0, len(periods), block)]
+    args = [(df, b, transaction_cost, starts, ends) for b in blocks]
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_window_returns, *zip(*args)))
+    else:
+        parts = [_window_returns(*a) for a in args]
+    gross = np.vstack([p[0] for p in parts])
+    net = np.vstack([p[1] for p in parts])
+
+    if select not in ('Cumulative Return %', 'Cumulative Return (net) %'):
+        raise KeyError(f"Unknown selection column: {select}")
+    score = gross if select == 'Cumulative Return %' else net
+    # like idxmax: first period with the best score, NaN never wins
+    best_row = np.argmax(np.where(np.isnan(score), -np.inf, score), axis=0)
+    best = periods[best_row]
+
+    # stitch the chosen period's positions over each test window
+    chosen = np.unique(best)
+    positions = hilo_matrix(df, chosen, transaction_cost)['Position']
+    oos_start = bounds[0][2]
+    oos_end = bounds[-1][3]
+    hilo = np.empty(oos_end - oos_start, dtype=np.int64)
+    stitched = np.empty(oos_end - oos_start)
+    for (_, _, t0, t1), p in zip(bounds, best):
+        row = np.searchsorted(chosen, p)
+        hilo[t0 - oos_start:t1 - oos_start] = p
+        stitched[t0 - oos_start:t1 - oos_start] = positions[row, t0:t1]
+    close = df['Adj Close'].to_numpy(dtype=np.float64)[oos_start:oos_end]
+    oos_gross, oos_net = hilo_returns(close, stitched[None, :], transaction_cost)
+
+    oos = pd.DataFrame({
+        'Adj Close': close,
+        'HiLo': hilo,
+        'Position': stitched,
+        'Cumulative Return': oos_gross[0],
+        'Cumulative Return (net)': oos_net[0],
+    }, index=df.index[oos_start:oos_end])
+
+    # out-of-sample return of each test window from the stitched curves
+    curve_g = ffill_curves(oos_gross)[0]
+    curve_n = ffill_curves(oos_net)[0]
+    index = df.index
+    records = []
+    for i, (s, e, t0, t1) in enumerate(bounds):
+        a = t0 - oos_start - 1
+        b = t1 - oos_start - 1
+        records.append({
+            'Train Start': index[s],
+            'Train End': index[e - 1],
+            'Test Start': index[t0],
+            'Test End': index[t1 - 1],
+            'HiLo': int(best[i]),
+            'In-Sample Return %': gross[best_row[i], i],
+            'In-Sample Return (net) %': net[best_row[i], i],
+            'Out-of-Sample Return %': curve_g[b] / (curve_g[a] if a >= 0 else 1.0),
+            'Out-of-Sample Return (net) %': curve_n[b] / (curve_n[a] if a >= 0 else 1.0),
+        })
+    return pd.DataFrame(records), oos
+
+
+def _windows(n: int, train: int, test: int, expanding: bool) -> list[tuple[int, int, int, int]]:
+    # (train start, train end, test start, test end), ends exclusive
+    bounds = []
+    t0 = train
+    while t0 < n:
+        t1 = min(t0 + test, n)
+        bounds.append((0 if expanding else t0 - train, t0, t0, t1))
+        t0 = t1
+    return bounds
+
+
+def _window_returns(df, periods, transaction_cost, starts, ends):
+    # gross/net growth from the close of bar 'start' to the close of bar
+    # 'end - 1' for every period and window; positions come from the full
+    # history, so the averages are already warmed up at the window start
+    res = hilo_matrix(df, periods, transaction_cost)
+    gross = ffill_curves(res['Cumulative Return'])
+    net = ffill_curves(res['Cumulative Return (net)'])
+    return (gross[:, ends - 1] / gross[:, starts],
+            net[:, ends - 1] / net[:, starts])
+